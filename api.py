@@ -0,0 +1,238 @@
+import argparse
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+from executor import execute_sql, fresh_sandbox
+from limits import MAX_RESULT_ROWS
+from question_bank import CATEGORIES, category_key, find_category, find_question, grade_answer, iter_questions
+
+# Headless JSON API over the same fixtures, executor and grader as app.py:
+#
+#   GET    /health
+#   GET    /questions[?category=dml]
+#   GET    /questions/<question id>
+#   POST   /sessions                   {"category": "dml"}
+#   POST   /sessions/<id>/execute      {"sql": "...", "max_rows": 1000}  (at most MAX_RESULT_ROWS)
+#   DELETE /sessions/<id>
+#   POST   /grade                      {"question": "dml/insert/1", "sql": "...", "efficiency": false}
+
+MAX_BODY_BYTES = 1 * 2**20
+DEFAULT_MAX_ROWS = 1000
+SESSION_IDLE_SECONDS = 30 * 60
+MAX_SESSIONS = 1000
+
+# The parts of a question a client may see: the prompt, the schema set up
+# before the answer runs, the query to improve and the work budget. The
+# solution and explanation stay on the server.
+PUBLIC_QUESTION_FIELDS = ("question", "setup", "slow_query", "budget")
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+            500: "Internal Server Error", 503: "Service Unavailable"}
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class SqlPracticeApi:
+    def __init__(self, workers=4, queue_size=64):
+        # Blocking SQLite work runs on a bounded thread pool; requests beyond
+        # workers + queue_size are rejected with 503 instead of piling up
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sql-worker")
+        self.capacity = workers + queue_size
+        self.in_flight = 0
+        self.sessions = {}
+        self.sessions_lock = threading.Lock()
+
+    # Handlers run on the worker pool
+
+    def list_questions(self, query):
+        wanted = query.get("category", [None])[0]
+        category = find_category(wanted) if wanted else None
+        return {"questions": [
+            {"id": qid, "category": cat, "type": question_type, "index": index,
+             "question": question["question"]}
+            for qid, cat, question_type, index, question in iter_questions()
+            if category is None or cat == category
+        ]}
+
+    def get_question(self, qid):
+        category, question = find_question(qid)
+        return {"id": qid, "category": category,
+                **{field: question[field] for field in PUBLIC_QUESTION_FIELDS if field in question}}
+
+    def create_session(self, body):
+        category = find_category(body.get("category", ""))
+        self._expire_sessions()
+        with self.sessions_lock:
+            if len(self.sessions) >= MAX_SESSIONS:
+                raise HttpError(503, "Too many open sessions")
+        conn = fresh_sandbox(CATEGORIES[category].fixture)
+        session_id = uuid.uuid4().hex
+        with self.sessions_lock:
+            self.sessions[session_id] = {"conn": conn, "category": category, "lock": threading.Lock(),
+                                         "used": time.monotonic(), "closed": False}
+        return {"session": session_id, "category": category_key(category)}
+
+    def execute(self, session_id, body):
+        session = self._session(session_id)
+        max_rows = body.get("max_rows", DEFAULT_MAX_ROWS)
+        if isinstance(max_rows, bool) or not isinstance(max_rows, int) or max_rows < 1:
+            raise HttpError(400, "max_rows must be a positive integer")
+        max_rows = min(max_rows, MAX_RESULT_ROWS)
+        with session["lock"]:
+            if session["closed"]:
+                raise HttpError(404, "Unknown session")
+            session["used"] = time.monotonic()
+            try:
+                result = execute_sql(session["conn"], body.get("sql", ""), max_rows=max_rows)
+            except (sqlite3.Error, ValueError) as e:
+                raise HttpError(400, str(e))
+        result["rows"] = [list(row) for row in result["rows"]]
+        return result
+
+    def close_session(self, session_id):
+        with self.sessions_lock:
+            session = self.sessions.pop(session_id, None)
+        if session is None:
+            raise HttpError(404, "Unknown session")
+        self._close(session)
+        return {"closed": session_id}
+
+    def grade(self, body):
+        category, question = find_question(body.get("question", ""))
+        return grade_answer(category, question, body.get("sql", ""), bool(body.get("efficiency")))
+
+    def _session(self, session_id):
+        with self.sessions_lock:
+            session = self.sessions.get(session_id)
+        if session is None:
+            raise HttpError(404, "Unknown session")
+        return session
+
+    def _close(self, session):
+        # Waits for a statement still running on the session; an execute
+        # that was waiting for it then finds the session closed
+        with session["lock"]:
+            session["conn"].close()
+            session["closed"] = True
+
+    def _expire_sessions(self):
+        cutoff = time.monotonic() - SESSION_IDLE_SECONDS
+        with self.sessions_lock:
+            expired = [self.sessions.pop(sid) for sid, s in list(self.sessions.items()) if s["used"] < cutoff]
+        for session in expired:
+            self._close(session)
+
+    # Routing
+
+    def route(self, method, path, query, body):
+        parts = [part for part in path.split("/") if part]
+        if method == "GET" and parts == ["health"]:
+            return lambda: {"status": "ok", "sessions": len(self.sessions)}
+        if method == "GET" and parts == ["questions"]:
+            return lambda: self.list_questions(query)
+        if method == "GET" and len(parts) > 1 and parts[0] == "questions":
+            return lambda: self.get_question("/".join(parts[1:]))
+        if method == "POST" and parts == ["sessions"]:
+            return lambda: self.create_session(body)
+        if method == "POST" and len(parts) == 3 and parts[0] == "sessions" and parts[2] == "execute":
+            return lambda: self.execute(parts[1], body)
+        if method == "DELETE" and len(parts) == 2 and parts[0] == "sessions":
+            return lambda: self.close_session(parts[1])
+        if method == "POST" and parts == ["grade"]:
+            return lambda: self.grade(body)
+        raise HttpError(404, f"No route for {method} {path}")
+
+    async def dispatch(self, method, target, raw_body):
+        url = urlsplit(target)
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict):
+                raise HttpError(400, "Request body must be a JSON object")
+            handler = self.route(method, url.path, parse_qs(url.query), body)
+            if self.in_flight >= self.capacity:
+                raise HttpError(503, "Server busy")
+            self.in_flight += 1
+            try:
+                payload = await asyncio.get_running_loop().run_in_executor(self.pool, handler)
+            finally:
+                self.in_flight -= 1
+            return 200, payload
+        except HttpError as e:
+            return e.status, {"error": e.message}
+        except KeyError as e:
+            return 404, {"error": f"Not found: {e.args[0]}"}
+        except json.JSONDecodeError as e:
+            return 400, {"error": f"Invalid JSON: {e}"}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+    async def handle_connection(self, reader, writer):
+        # Minimal HTTP/1.1 with keep-alive
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    status, payload = 413, {"error": "Request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.dispatch(method.upper(), target, body)
+                    keep_alive = (version == "HTTP/1.1"
+                                  and headers.get("connection", "").lower() != "close")
+
+                data = json.dumps(payload, default=str).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"SQL practice API listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless SQL practice API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=64)
+    args = parser.parse_args()
+
+    api = SqlPracticeApi(args.workers, args.queue_size)
+    try:
+        asyncio.run(api.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
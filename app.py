@@ -1,57 +1,35 @@
 import streamlit as st
-import sqlite3
-from ddl_questions import ddl_questions
-from dml_questions import dml_questions
-from dql_questions import dql_questions
-from tcl_questions import tcl_questions
-from joins import joins_questions
-from windows import window_questions
-from cte import cte_questions
-from triggers import trigger_questions
+from question_bank import CATEGORIES
+from sandbox import PERFORMANCE_PROFILES, session_sandbox
+from profiler import finish_profiling, start_profiling
+from search import search_sidebar
 # from stored_procedures import stored_procedure_app
-# Set up the SQLite database
-conn = sqlite3.connect(':memory:')
-cursor = conn.cursor()
 
-# Create a sample table for testing
-cursor.execute('''
-    CREATE TABLE employees (
-        id INTEGER PRIMARY KEY,
-        name TEXT,
-        department TEXT,
-        salary REAL
-    )
-''')
-conn.commit()
+# Opt-in profiling of this whole run (SQL_PRACTICE_PROFILE=1)
+profiler = start_profiling()
 
 st.title("SQL Practice Website")
 
 # Sidebar for navigation
 category = st.sidebar.selectbox(
     "Select SQL Category",
-    ["DDL", "DML", "DQL", "TCL", "JOINS", "WINDOW FUNCTION", "CTEs", "TRIGGERS"]
+    list(CATEGORIES.keys()),
+    key="category"
 )
 
-if category == "DDL":
-    ddl_questions(conn, cursor)
-elif category == "DML":
-    dml_questions(conn, cursor)
-elif category == "DQL":
-    dql_questions(conn, cursor)
-# elif category == "DCL":
-#     dcl_questions(conn, cursor)
-elif category == "TCL":
-    tcl_questions(conn, cursor)
-elif category == "JOINS":
-    joins_questions(conn, cursor)
-elif category == "WINDOW FUNCTION":
-    window_questions(conn, cursor)
-elif category == "CTEs":
-    cte_questions(conn, cursor)
-elif category == "TRIGGERS":
-    trigger_questions(conn, cursor)
-# elif category == "STORED PROCEDURES":
-#     stored_procedure_app(conn, cursor)
-# Add other categories as needed
-
-conn.close()
+# Performance profile applied to the sandbox connection
+profile = st.sidebar.selectbox("Performance Profile", list(PERFORMANCE_PROFILES.keys()))
+
+# Full-text search across every category's questions
+search_sidebar()
+
+# The session's SQLite sandbox, kept open for fragment reruns
+conn = session_sandbox(profile)
+cursor = conn.cursor()
+
+# Every category renders through the same page (category.py)
+# DCL and STORED PROCEDURES are not implemented yet; add a Category to
+# question_bank.CATEGORIES to add a page
+CATEGORIES[category].render(conn, cursor)
+
+finish_profiling(profiler, category)
@@ -0,0 +1,13 @@
+from fixtures import FIXTURE_DIR, mock_data_fixture, write_images
+from question_bank import CATEGORIES
+from search import SEARCH_DB_PATH, build_search_index
+
+def main():
+    fixtures = [spec.fixture for spec in CATEGORIES.values()] + [mock_data_fixture]
+    write_images(fixtures)
+    print(f"Wrote {len(fixtures)} fixture images to {FIXTURE_DIR}")
+    build_search_index()
+    print(f"Built the question search index in {SEARCH_DB_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import csv
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import pandas as pd
+from pandas.api import types as ptypes
+from limits import PROGRESS_STEPS, QUERY_TIMEOUT_SECONDS, apply_limits, limit_error
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# insert mode, commit mode
+LOAD_STRATEGIES = {
+    "Row-by-row, commit every row": ("row", "row"),
+    "Row-by-row, one transaction": ("row", "once"),
+    "executemany, commit every chunk": ("batch", "chunk"),
+    "executemany, one transaction": ("batch", "once"),
+}
+
+GENERATED_COLUMNS = ['id', 'name', 'department_id', 'salary', 'hire_date']
+
+# Each benchmark run loads at most this many rows (a commit per row pays an
+# fsync per row, so that strategy gets far fewer) and stops loading once it
+# has run for QUERY_TIMEOUT_SECONDS
+BULK_LOAD_MAX_ROWS = 200000
+ROW_COMMIT_MAX_ROWS = 2000
+
+def generate_employees_file(path, rows, file_type="csv", seed=0, chunk_size=10000):
+    # Write an employees-shaped file chunk by chunk so large files never sit in memory
+    rng = random.Random(seed)
+
+    def chunks():
+        for start in range(0, rows, chunk_size):
+            yield [(i + 1, f"Employee {i + 1}", rng.randint(1, 20),
+                    rng.randrange(30000, 150000, 500),
+                    f"20{rng.randint(15, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+                   for i in range(start, min(start + chunk_size, rows))]
+
+    if file_type == "csv":
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(GENERATED_COLUMNS)
+            for chunk in chunks():
+                writer.writerows(chunk)
+    else:
+        if pq is None:
+            raise RuntimeError("Parquet support requires pyarrow")
+        schema = pa.schema([("id", pa.int64()), ("name", pa.string()),
+                            ("department_id", pa.int64()), ("salary", pa.int64()),
+                            ("hire_date", pa.string())])
+        with pq.ParquetWriter(path, schema) as writer:
+            for chunk in chunks():
+                writer.write_table(pa.Table.from_pylist(
+                    [dict(zip(GENERATED_COLUMNS, row)) for row in chunk], schema=schema))
+
+def iter_chunks(source, file_type="csv", chunk_size=10000):
+    # Yield DataFrames of at most chunk_size rows from a path or file object
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if file_type == "csv":
+        yield from pd.read_csv(source, chunksize=chunk_size)
+    else:
+        if pq is None:
+            raise RuntimeError("Parquet support requires pyarrow")
+        parquet = pq.ParquetFile(source, memory_map=isinstance(source, (str, os.PathLike)))
+        for batch in parquet.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+def sqlite_type(dtype):
+    if ptypes.is_bool_dtype(dtype) or ptypes.is_integer_dtype(dtype):
+        return "INTEGER"
+    if ptypes.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+def chunk_records(chunk):
+    # Plain Python values (no numpy scalars, NaN -> NULL) that sqlite3 can bind
+    return list(chunk.astype(object).where(chunk.notna(), None)
+                .itertuples(index=False, name=None))
+
+def create_table_for(conn, table, chunk, column_types=None):
+    column_types = column_types or {c: sqlite_type(t) for c, t in chunk.dtypes.items()}
+    columns = ", ".join(f'"{c}" {column_types[c]}' for c in chunk.columns)
+    conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+    conn.execute(f'CREATE TABLE "{table}" ({columns})')
+    placeholders = ", ".join("?" for _ in chunk.columns)
+    return f'INSERT INTO "{table}" VALUES ({placeholders})'
+
+def head_chunks(chunks, max_rows):
+    # The chunks cut off after max_rows rows in total
+    rows = 0
+    for chunk in chunks:
+        if rows >= max_rows:
+            return
+        chunk = chunk.iloc[:max_rows - rows]
+        rows += len(chunk)
+        yield chunk
+
+def load_chunks(conn, table, chunks, insert_mode="batch", commit_mode="once",
+                with_indexes=False, on_chunk=None, column_types=None, deadline=None):
+    # With a deadline, loading stops early (keeping the rows loaded so far)
+    # once time.perf_counter() passes it
+    rows = 0
+    insert_sql = None
+    for chunk in chunks:
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+        if insert_sql is None:
+            insert_sql = create_table_for(conn, table, chunk, column_types)
+            if with_indexes:
+                for column in chunk.columns[1:]:
+                    conn.execute(f'CREATE INDEX "idx_{table}_{column}" ON "{table}"("{column}")')
+            conn.commit()
+        records = chunk_records(chunk)
+        if insert_mode == "row":
+            for loaded, record in enumerate(records):
+                if deadline is not None and time.perf_counter() > deadline:
+                    records = records[:loaded]
+                    break
+                conn.execute(insert_sql, record)
+                if commit_mode == "row":
+                    conn.commit()
+        else:
+            conn.executemany(insert_sql, records)
+        if commit_mode == "chunk":
+            conn.commit()
+        rows += len(records)
+        if on_chunk is not None:
+            on_chunk(rows)
+    conn.commit()
+    return rows
+
+def compare_strategies(source, file_type, strategies, index_options=(False, True),
+                       chunk_size=10000, on_disk=True):
+    # Load the same file once per (strategy, index option) into a fresh sandbox,
+    # each run under the sandbox limits and its own time limit
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for run, (label, with_indexes) in enumerate(
+                (label, idx) for label in strategies for idx in index_options):
+            insert_mode, commit_mode = LOAD_STRATEGIES[label]
+            max_rows = ROW_COMMIT_MAX_ROWS if commit_mode == "row" else BULK_LOAD_MAX_ROWS
+            path = os.path.join(tmp, f"sandbox_{run}.db") if on_disk else ':memory:'
+            conn = sqlite3.connect(path)
+            try:
+                apply_limits(conn)
+                start = time.perf_counter()
+                deadline = start + QUERY_TIMEOUT_SECONDS
+                conn.set_progress_handler(lambda: time.perf_counter() > deadline, PROGRESS_STEPS)
+                try:
+                    rows = load_chunks(conn, "bulk_employees",
+                                       head_chunks(iter_chunks(source, file_type, chunk_size), max_rows),
+                                       insert_mode, commit_mode, with_indexes, deadline=deadline)
+                    elapsed = time.perf_counter() - start
+                except sqlite3.OperationalError as e:
+                    if getattr(e, "sqlite_errorname", "") != "SQLITE_INTERRUPT" and str(e) != "interrupted":
+                        raise
+                    # Stopped inside a statement: the run keeps the rows it committed
+                    elapsed = time.perf_counter() - start
+                    conn.rollback()
+                    conn.set_progress_handler(None, 0)
+                    try:
+                        rows = conn.execute('SELECT count(*) FROM "bulk_employees"').fetchone()[0]
+                    except sqlite3.OperationalError:
+                        rows = 0
+            except sqlite3.Error as e:
+                raise limit_error(e) or e
+            finally:
+                conn.close()
+            results.append({
+                "strategy": label,
+                "indexes": "with indexes" if with_indexes else "no indexes",
+                "rows": rows,
+                "seconds": elapsed,
+                "rows_per_second": rows / elapsed if elapsed else None,
+                "stopped_at_time_limit": elapsed > QUERY_TIMEOUT_SECONDS,
+            })
+    return pd.DataFrame(results)
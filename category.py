@@ -0,0 +1,377 @@
+import streamlit as st
+import pandas as pd
+import sqlite3
+from fixtures import data_version, fixture_image, load_fixture
+from history import history_controls, history_sandbox
+from executor import execute_sql, grade
+from efficiency import grade_within_budget, score_efficiency
+from equivalence import find_counterexample, show_counterexample
+from sandbox import profile_comparison, show_usage
+from limits import MAX_RESULT_ROWS
+from change_capture import ChangeCapture, highlight_changes
+from export import export_buttons
+from engines import ENGINES, engine_choice, engine_comparison
+from query_log import current_user, log_query, query_history
+from profiler import profile_fragment
+from dataset_import import apply_finished_import, dataset_image, dataset_import_panel, dataset_tables, load_dataset
+
+# Preview tables keyed by (sandbox data version, table, row limit); an
+# unchanged sandbox costs no queries. Oldest entries go first past the limit.
+MAX_CACHED_PREVIEWS = 256
+DATASET_PREVIEW_ROWS = 100
+_previews = {}
+
+def _cache_preview(key, preview):
+    _previews[key] = preview
+    while len(_previews) > MAX_CACHED_PREVIEWS:
+        del _previews[next(iter(_previews))]
+
+def category_key(name):
+    return name.lower().replace(" ", "_")
+
+def question_id(category, question_type, index):
+    return f"{category_key(category)}/{question_type}/{index}"
+
+def _title(value):
+    return value.replace('_', ' ').title()
+
+class Category:
+    # One practice category, declared as data: its fixture, question bank,
+    # grading mode ("result" compares returned rows, "state" the database
+    # after the query plus any probe statements; type_grading overrides it
+    # for whole question types) and the tables to preview.
+    # render() is the page every category shares; subclasses override the
+    # submit hooks, and `tools` adds extra toggles under the question as
+    # {label: function(category, selection)}. Questions may carry a "setup"
+    # script that runs before the learner's, in the sandbox and when grading.
+    # With capture_changes, a submit re-reads only the preview rows it changed
+    # and highlights them. `engines` lists the engines learners may run
+    # queries on (see engines.py). With equivalence, result-graded answers
+    # that match on the fixture must also match on randomized instances of
+    # its schema (see equivalence.py).
+
+    def __init__(self, name, header, fixture, questions, grading="result", type_grading=None, probes=(),
+                 previews=(), preview_rows=None, history=False,
+                 type_label="Select Question Type:", type_format=_title,
+                 success_message="Query executed successfully!", tools=None,
+                 capture_changes=False, engines=("SQLite",), equivalence=True):
+        self.name = name
+        self.key = category_key(name)
+        self.header = header
+        self.fixture = fixture
+        self.questions = questions
+        self.grading = grading
+        self.type_grading = dict(type_grading or {})
+        self.probes = list(probes)
+        self.previews = list(previews)
+        self.preview_rows = preview_rows
+        self.history = history
+        self.type_label = type_label
+        self.type_format = type_format
+        self.success_message = success_message
+        self.tools = dict(tools or {})
+        self.capture_changes = capture_changes
+        self.engines = list(engines)
+        self.equivalence = equivalence
+        if len(self.engines) > 1:
+            self.tools["Engine comparison"] = engine_comparison
+
+    # Grading
+
+    def grading_for(self, question):
+        for question_type, mode in self.type_grading.items():
+            if any(question is other for other in self.questions.get(question_type, ())):
+                return mode
+        return self.grading
+
+    def grade(self, question, sql, efficiency=False):
+        # With efficiency=True, correct answers to result-graded questions also
+        # get an efficiency score against the reference solution
+        if "budget" in question:
+            return grade_within_budget(self.fixture, question, sql)
+        mode = self.grading_for(question)
+        result = grade(self.fixture, question, sql, mode, self.probes)
+        if result["correct"] and self.equivalence and mode == "result":
+            counterexample = find_counterexample(self.fixture, question["solution"], sql)
+            if counterexample is not None:
+                result.update(correct=False, counterexample=counterexample)
+        if efficiency and result["correct"] and mode == "result":
+            result["efficiency"] = score_efficiency(self.fixture, question, sql)
+        return result
+
+    # Pipeline steps
+
+    def setup(self, conn):
+        # Fresh fixture (or the session's imported dataset) on every run, or
+        # the session's undo/redo state
+        apply_finished_import(self.key)
+        if self.history:
+            return history_sandbox(conn, self.key, self.fixture)
+        if not load_dataset(conn, self.key):
+            load_fixture(conn, self.fixture)
+        return None
+
+    def source_image(self, history):
+        # The image this run's sandbox was loaded from
+        if history is not None:
+            return history.current_image()
+        return dataset_image(self.key) or fixture_image(self.fixture)
+
+    def preview_tables(self, cursor):
+        return self.previews + dataset_tables(cursor.connection, self.key)
+
+    def preview_limit(self, table):
+        # Imported datasets can be large, so their previews are always truncated
+        return self.preview_rows if table in self.previews else DATASET_PREVIEW_ROWS
+
+    def preview(self, cursor, table):
+        # {"df": first rows, "rows": row count, "indexes": index names}; row
+        # count and indexes are only shown when previews are truncated
+        version = data_version(cursor.connection)
+        max_rows = self.preview_limit(table)
+        key = (version, table, max_rows)
+        if version is not None and key in _previews:
+            return _previews[key]
+        limit = f" LIMIT {max_rows}" if max_rows else ""
+        try:
+            # Rows are indexed by rowid so change capture can patch them
+            cursor.execute(f"SELECT rowid AS __rowid, * FROM {table}{limit}")
+            rows = cursor.fetchall()
+            preview = {"df": pd.DataFrame([row[1:] for row in rows],
+                                          columns=[c[0] for c in cursor.description][1:],
+                                          index=[row[0] for row in rows])}
+        except sqlite3.OperationalError:
+            cursor.execute(f"SELECT * FROM {table}{limit}")
+            preview = {"df": pd.DataFrame(cursor.fetchall(), columns=[c[0] for c in cursor.description])}
+        if max_rows:
+            preview["rows"] = cursor.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            preview["indexes"] = [row[1] for row in cursor.execute(f"PRAGMA index_list({table})")]
+        if version is not None:
+            _cache_preview(key, preview)
+        return preview
+
+    def refreshed_preview(self, cursor, table, capture):
+        # The cached pre-submit preview patched with the captured changes;
+        # None when it cannot be patched (truncated previews, schema changes)
+        if self.preview_limit(table):
+            return None
+        before = _previews.get((capture.version, table, None))
+        refreshed = capture.refresh(cursor, table, before["df"] if before else None)
+        version = data_version(cursor.connection)
+        if refreshed is not None and version is not None:
+            _cache_preview((version, table, None), {"df": refreshed["df"]})
+        return refreshed
+
+    def show_previews(self, cursor, capture=None):
+        tables = self.preview_tables(cursor)
+        for col, table in zip(st.columns(len(tables)), tables):
+            with col:
+                refreshed = self.refreshed_preview(cursor, table, capture) if capture else None
+                if refreshed is not None:
+                    st.write(f"**{_title(table)} Table**")
+                    st.dataframe(highlight_changes(refreshed["df"], refreshed["inserted"],
+                                                   refreshed["updated"]), hide_index=True)
+                    counts = (len(refreshed["inserted"]), len(refreshed["updated"]), refreshed["deleted"])
+                    if any(counts):
+                        st.caption("%d inserted · %d updated · %d deleted" % counts)
+                    continue
+                preview = self.preview(cursor, table)
+                if "rows" in preview:
+                    st.write(f"**{_title(table)} Table** ({preview['rows']:,} rows)")
+                else:
+                    st.write(f"**{_title(table)} Table**")
+                st.dataframe(preview["df"], hide_index=True)
+                if "indexes" in preview:
+                    st.caption("Indexes: " + (", ".join(preview["indexes"]) or "none"))
+
+    def select_question(self):
+        question_type = st.selectbox(self.type_label, list(self.questions.keys()),
+                                     format_func=self.type_format, key=f"{self.key}_type")
+        question_index = st.selectbox("Select Question:",
+                                      range(1, len(self.questions[question_type]) + 1),
+                                      format_func=lambda x: f"Question {x}", key=f"{self.key}_question")
+        return question_type, question_index, self.questions[question_type][question_index - 1]
+
+    def before_submit(self, conn, cursor):
+        return None
+
+    def show_submission(self, conn, cursor, selection, result, context):
+        if result["columns"] is not None:
+            if result["rows"]:
+                st.success("Query executed successfully!")
+                st.write("Result:")
+                st.dataframe(pd.DataFrame(result["rows"], columns=result["columns"]))
+            else:
+                st.warning("Query returned no results.")
+        else:
+            st.success(self.success_message)
+            if self.preview_tables(cursor):
+                st.write("Updated Tables:")
+                self.show_previews(cursor, selection["capture"])
+
+    def show_grade(self, selection):
+        graded = self.grade(selection["question"], selection["sql"])
+        if graded["error"]:
+            st.warning(f"Could not check against the reference solution: {graded['error']}")
+            return graded
+        score = graded.get("efficiency")
+        if score is not None:
+            if graded["budget_steps"] is None:
+                st.warning(f"Correct results, but the budget could not be checked: {score['verdict']}.")
+            elif graded["correct"]:
+                st.success(f"Within budget: {score['verdict']}.")
+            else:
+                st.error(f"Over budget: {score['verdict']}.")
+            if score["learner"] is not None:
+                col1, col2 = st.columns(2)
+                col1.metric("VM steps", f"{score['learner']['steps']:,}",
+                            f"budget {graded['budget_steps']:,}", delta_color="off")
+                col2.metric("Time", f"{score['learner']['seconds'] * 1000:.1f} ms")
+                st.write("Query plan:")
+                st.code("\n".join(score["learner"]["plan"]))
+        elif graded["correct"]:
+            st.success("Correct: matches the reference solution.")
+        elif "counterexample" in graded:
+            show_counterexample(self, graded["counterexample"])
+        else:
+            st.info("Runs, but does not match the reference solution yet.")
+        return graded
+
+    def log_submission(self, selection, engine, result, outcome, error=None):
+        row_count = None
+        if result is not None:
+            row_count = len(result["rows"]) if result["columns"] is not None else result["changes"]
+        log_query(current_user(), selection["question_id"], self.name, engine, selection["sql"],
+                  result["seconds"] if result is not None else None, row_count, outcome, error)
+
+    # The page
+
+    def render(self, conn, cursor):
+        # Full runs load the sandbox and draw the page once; the question
+        # area below is a fragment, so picking a question, typing, Submit and
+        # Show Solution rerun only that part (see question_panel)
+        st.header(self.header)
+
+        history = self.setup(conn)
+        if history is None:
+            # Without history every submit starts from this same image
+            self.show_preview_section(cursor)
+
+        self.question_panel(conn, cursor, history)
+
+    def show_preview_section(self, cursor):
+        if self.preview_tables(cursor):
+            st.subheader("Available Tables:")
+            self.show_previews(cursor)
+            st.divider()
+
+    def refresh_sandbox(self, conn):
+        # Fragment reruns skip the full run's setup(), so reload the sandbox
+        # if the last submit (or a failed one) left it changed
+        version = data_version(conn)
+        if version is None or version[1]:
+            self.setup(conn)
+
+    @st.fragment
+    @profile_fragment
+    def question_panel(self, conn, cursor, history):
+        self.refresh_sandbox(conn)
+        if history is not None:
+            # The state changes with every submit, so it is shown in here;
+            # unchanged states cost no queries (see preview())
+            history_controls(conn, history, self.fixture)
+            self.show_preview_section(cursor)
+
+        question_type, question_index, question = self.select_question()
+        if "setup" in question and history is None:
+            # Tables the question starts from; they count as a change, so the
+            # next run reloads the fixture and runs the setup again
+            execute_sql(conn, question["setup"])
+
+        st.subheader("Question:")
+        st.write(question["question"])
+        if "setup" in question:
+            st.caption("Your query runs after:")
+            st.code(question["setup"], language="sql")
+        if "slow_query" in question:
+            st.code(question["slow_query"], language="sql")
+        if "budget" in question:
+            st.caption(f"Budget: at most {question['budget']}x the work of the reference solution")
+
+        user_query = st.text_area("Enter your SQL query:")
+        engine = engine_choice(self)
+        selection = {
+            "type": question_type,
+            "index": question_index,
+            "question": question,
+            "sql": user_query,
+            "key": f"{self.key}_{question_type}_{question_index}",
+            "label": f"{_title(question_type)} {question_index}",
+            "question_id": question_id(self.name, question_type, question_index),
+        }
+
+        if st.button("Submit"):
+            self.submit(conn, cursor, history, selection, engine)
+
+        self.solution_panel(question)
+
+        st.divider()
+        self.tool_panel(conn, selection)
+
+    def submit(self, conn, cursor, history, selection, engine):
+        user_query = selection["sql"]
+        selection["capture"] = None
+        try:
+            if self.capture_changes:
+                selection["capture"] = ChangeCapture(conn, self.previews)
+            context = self.before_submit(conn, cursor)
+            if engine == "SQLite":
+                result = execute_sql(conn, user_query, max_rows=MAX_RESULT_ROWS)
+            else:
+                # Other engines run on a copy; the sandbox is left unchanged
+                result = ENGINES[engine].execute(self.source_image(history), data_version(conn),
+                                                 user_query, max_rows=MAX_RESULT_ROWS)
+                st.caption(f"Ran on {engine} in {result['seconds'] * 1000:.1f} ms")
+            self.show_submission(conn, cursor, selection, result, context)
+            # Exports re-run the script on the state it was submitted against
+            if result["columns"] is not None and engine == "SQLite":
+                export_buttons(self.source_image(history), user_query, result, selection["key"])
+
+            # Keep this state for Undo / Redo
+            if history is not None:
+                history.record(conn)
+            show_usage(conn, result)
+            with st.spinner("Checking against the reference solution..."):
+                graded = self.show_grade(selection)
+            self.log_submission(selection, engine, result,
+                                "correct" if graded["correct"] else "incorrect")
+        except Exception as e:
+            st.error(f"Error executing query: {str(e)}")
+            self.log_submission(selection, engine, None, "error", str(e))
+        finally:
+            if selection["capture"] is not None:
+                selection["capture"].remove()
+
+    @st.fragment
+    @profile_fragment
+    def solution_panel(self, question):
+        if st.button("Show Solution", key="show_solution"):
+            st.code(question["solution"], language="sql")
+            if question.get("explanation"):
+                st.write("Explanation:")
+                st.write(question["explanation"])
+
+    @st.fragment
+    @profile_fragment
+    def tool_panel(self, conn, selection):
+        self.refresh_sandbox(conn)
+        if st.toggle("Compare performance profiles"):
+            question = selection["question"]
+            profile_comparison(self.fixture, question["solution"], selection["key"], question.get("setup"))
+        if st.toggle("Import a dataset"):
+            dataset_import_panel(self, conn)
+        if st.toggle("Query history"):
+            query_history(self, selection)
+        for label, tool in self.tools.items():
+            if st.toggle(label):
+                tool(self, selection)
@@ -0,0 +1,118 @@
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import pandas as pd
+from executor import split_statements
+from limits import (MAX_FETCH_ROWS, PROGRESS_STEPS, QUERY_TIMEOUT_SECONDS, apply_limits,
+                    limit_error, time_limit_error)
+from perf import percentiles
+
+BEGIN_MODES = ["DEFERRED", "IMMEDIATE", "EXCLUSIVE"]
+
+_BEGIN = re.compile(r"^\s*BEGIN(\s+(DEFERRED|IMMEDIATE|EXCLUSIVE))?(\s+TRANSACTION)?\s*$", re.IGNORECASE)
+_END = re.compile(r"^\s*(COMMIT|END|ROLLBACK)(\s+TRANSACTION)?\s*$", re.IGNORECASE)
+
+def as_transaction(script, mode):
+    # Force the script into a single BEGIN <mode> ... COMMIT block
+    statements = [s for s in split_statements(script) if not _BEGIN.match(s)]
+    if not statements or not _END.match(statements[-1]):
+        statements.append("COMMIT")
+    return [f"BEGIN {mode}"] + statements
+
+def _is_locked(error):
+    message = str(error).lower()
+    return "database is locked" in message or "database is busy" in message
+
+def _worker(path, statements, transactions, stats, lock, start_barrier):
+    # Same limits as a submit (see executor.execute_sql); all of a worker's
+    # transactions share one deadline, and a limit stops the worker
+    conn = sqlite3.connect(path, timeout=0, isolation_level=None, check_same_thread=False)
+    apply_limits(conn)
+    latencies, retries, errors = [], 0, []
+    stopped = False
+    start_barrier.wait()
+    deadline = time.perf_counter() + QUERY_TIMEOUT_SECONDS
+    conn.set_progress_handler(lambda: time.perf_counter() > deadline, PROGRESS_STEPS)
+    for _ in range(transactions):
+        started = time.perf_counter()
+        backoff = 0.0005
+        while not stopped:
+            if time.perf_counter() > deadline:
+                errors.append(str(time_limit_error()))
+                stopped = True
+                break
+            try:
+                for statement in statements:
+                    conn.execute(statement).fetchmany(MAX_FETCH_ROWS)
+                latencies.append(time.perf_counter() - started)
+                break
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                if not _is_locked(e):
+                    error = limit_error(e)
+                    errors.append(str(error or e))
+                    stopped = error is not None
+                    break
+                retries += 1
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 0.05)
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                errors.append(str(e))
+                break
+        if stopped:
+            break
+    conn.close()
+    with lock:
+        stats["latencies"].extend(latencies)
+        stats["retries"] += retries
+        stats["errors"].extend(errors)
+
+def run_concurrent(script, mode, threads, transactions, setup):
+    # Run the script from `threads` connections against one WAL-mode sandbox file
+    statements = as_transaction(script, mode)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sandbox.db")
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        setup(conn.cursor())
+        conn.commit()
+        conn.close()
+
+        stats = {"latencies": [], "retries": 0, "errors": []}
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads + 1)
+        workers = [threading.Thread(target=_worker,
+                                    args=(path, statements, transactions, stats, lock, barrier))
+                   for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+    latencies = stats["latencies"]
+    cuts = percentiles(latencies)
+    return {
+        "mode": mode,
+        "threads": threads,
+        "commits": len(latencies),
+        "commits_per_second": len(latencies) / elapsed if elapsed else None,
+        "locked_retries": stats["retries"],
+        "errors": len(stats["errors"]),
+        "p50_ms": cuts[50] * 1000 if cuts[50] is not None else None,
+        "p95_ms": cuts[95] * 1000 if cuts[95] is not None else None,
+        "p99_ms": cuts[99] * 1000 if cuts[99] is not None else None,
+        "first_error": stats["errors"][0] if stats["errors"] else None,
+    }
+
+def compare_begin_modes(script, modes, threads, transactions, setup):
+    return pd.DataFrame([run_concurrent(script, mode, threads, transactions, setup)
+                         for mode in modes])
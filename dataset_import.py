@@ -0,0 +1,199 @@
+import streamlit as st
+import sqlite3
+import pandas as pd
+import io
+import itertools
+import os
+import re
+import threading
+import time
+from bulk_load import iter_chunks, load_chunks, pq, sqlite_type
+from fixtures import load_image
+from limits import apply_limits, limit_error
+
+# Uploaded CSV / Parquet files are loaded as new tables into a copy of the
+# page's sandbox. The resulting image replaces the fixture of that category
+# for the rest of the session (or becomes a new undo/redo state).
+IMPORT_CHUNK_ROWS = 50000
+TYPE_SAMPLE_ROWS = 1000
+
+# Uploads larger than this load in a background thread while the page polls
+BACKGROUND_BYTES = 5 * 2**20
+POLL_SECONDS = 0.5
+
+_import_ids = itertools.count(1)
+
+def table_name_for(file_name):
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    name = re.sub(r"\W+", "_", stem).strip("_").lower() or "dataset"
+    return f"t_{name}" if name[0].isdigit() else name
+
+def infer_column_types(source, file_type):
+    # Declared SQLite types from the first rows of a CSV, or the Parquet schema
+    source.seek(0)
+    if file_type == "csv":
+        sample = pd.read_csv(source, nrows=TYPE_SAMPLE_ROWS)
+    else:
+        sample = pq.ParquetFile(source).schema_arrow.empty_table().to_pandas()
+    source.seek(0)
+    return {column: sqlite_type(dtype) for column, dtype in sample.dtypes.items()}
+
+class ImportJob:
+    # Loads files [(table, file_type, bytes)] into a copy of a sandbox image.
+    # run() works inline; start() runs it in a thread while the page polls
+    # `progress` and `message`. `result` is the new image once `done`.
+
+    def __init__(self, image, files):
+        self.id = next(_import_ids)
+        self.image = image
+        self.files = files
+        self.tables = [table for table, file_type, data in files]
+        self.total_bytes = sum(len(data) for table, file_type, data in files)
+        self.rows = 0
+        self.progress = 0.0
+        self.message = "Starting import..."
+        self.seconds = None
+        self.error = None
+        self.result = None
+        self.done = False
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self, on_progress=None):
+        start = time.perf_counter()
+        conn = sqlite3.connect(':memory:')
+        try:
+            conn.deserialize(self.image)
+            apply_limits(conn)
+            loaded_bytes = 0
+            for table, file_type, data in self.files:
+                source = io.BytesIO(data)
+                column_types = infer_column_types(source, file_type)
+                total_rows = pq.ParquetFile(source).metadata.num_rows if file_type == "parquet" else None
+                loaded_rows = self.rows
+
+                def on_chunk(rows):
+                    # CSV progress is approximate: how far the reader got in the file
+                    fraction = rows / total_rows if total_rows else source.tell() / len(data)
+                    self.progress = (loaded_bytes + min(fraction, 1.0) * len(data)) / self.total_bytes
+                    self.rows = loaded_rows + rows
+                    self.message = f"Loading {table}: {rows:,} rows"
+                    if on_progress is not None:
+                        on_progress(self)
+
+                load_chunks(conn, table, iter_chunks(source, file_type, IMPORT_CHUNK_ROWS),
+                            "batch", "chunk", on_chunk=on_chunk, column_types=column_types)
+                loaded_bytes += len(data)
+            self.result = conn.serialize()
+        except sqlite3.Error as e:
+            self.error = str(limit_error(e) or e)
+        except (ValueError, RuntimeError, UnicodeDecodeError) as e:
+            self.error = f"Could not read the file: {e}"
+        finally:
+            conn.close()
+            self.files = None
+            self.image = None
+            self.seconds = time.perf_counter() - start
+            self.done = True
+
+def apply_finished_import(key):
+    # Move a finished import into the session: a new undo/redo state for
+    # categories with history, otherwise the image the page loads from now on
+    job = st.session_state.get(f"{key}_import")
+    if job is None or not job.done:
+        return
+    del st.session_state[f"{key}_import"]
+    if job.error:
+        st.session_state[f"{key}_import_error"] = job.error
+        return
+    tables = st.session_state.setdefault(f"{key}_dataset_tables", [])
+    tables.extend(table for table in job.tables if table not in tables)
+    st.session_state[f"{key}_import_summary"] = (
+        f"Imported {job.rows:,} rows into {', '.join(job.tables)} in {job.seconds:.1f}s.")
+    history = st.session_state.get(f"history_{key}")
+    if history is not None:
+        conn = sqlite3.connect(':memory:')
+        conn.deserialize(job.result)
+        history.record(conn)
+        conn.close()
+    else:
+        st.session_state[f"{key}_dataset"] = {"image": job.result, "version": f"dataset_{job.id}"}
+
+def dataset_image(key):
+    dataset = st.session_state.get(f"{key}_dataset")
+    return dataset["image"] if dataset is not None else None
+
+def load_dataset(conn, key):
+    # Load the session's imported image, if any; returns whether it did
+    dataset = st.session_state.get(f"{key}_dataset")
+    if dataset is None:
+        return False
+    load_image(conn, dataset["image"], dataset["version"])
+    return True
+
+def dataset_tables(conn, key):
+    # Imported tables that exist in the sandbox's current state
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return [table for table in st.session_state.get(f"{key}_dataset_tables", []) if table in existing]
+
+@st.fragment(run_every=POLL_SECONDS)
+def _import_progress(key):
+    job = st.session_state.get(f"{key}_import")
+    if job is None:
+        return
+    if job.done:
+        st.rerun()
+    st.progress(job.progress, text=f"{job.message} (running in the background)")
+
+def dataset_import_panel(category, conn):
+    key = category.key
+    st.subheader("Import a Dataset")
+    st.write("Load CSV or Parquet files into this page's sandbox as new tables, "
+             "next to the practice tables.")
+
+    if f"{key}_import" in st.session_state:
+        _import_progress(key)
+        return
+    error = st.session_state.pop(f"{key}_import_error", None)
+    if error:
+        st.error(f"Import failed: {error}")
+    summary = st.session_state.pop(f"{key}_import_summary", None)
+    if summary:
+        st.success(summary)
+
+    file_types = ["csv", "parquet"] if pq is not None else ["csv"]
+    uploads = st.file_uploader("Files:", type=file_types, accept_multiple_files=True,
+                               key=f"{key}_dataset_files")
+    names = {}
+    for upload in uploads or []:
+        names[upload.name] = st.text_input(f"Table name for {upload.name}:",
+                                           value=table_name_for(upload.name),
+                                           key=f"{key}_dataset_name_{upload.name}")
+
+    if st.button("Import", key=f"{key}_import_button", disabled=not uploads):
+        imported = set(st.session_state.get(f"{key}_dataset_tables", []))
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+        for table in names.values():
+            if not re.fullmatch(r"[A-Za-z_]\w*", table):
+                st.error(f"'{table}' is not a valid table name.")
+                return
+            if table in existing and table not in imported:
+                st.error(f"'{table}' is already a practice table; choose another name.")
+                return
+        conn.commit()
+        job = ImportJob(conn.serialize(), [
+            (names[upload.name], os.path.splitext(upload.name)[1].lstrip(".").lower(), upload.getvalue())
+            for upload in uploads])
+        st.session_state[f"{key}_import"] = job
+        if job.total_bytes > BACKGROUND_BYTES:
+            job.start()
+            _import_progress(key)
+        else:
+            bar = st.progress(0.0, text=job.message)
+            job.run(on_progress=lambda job: bar.progress(job.progress, text=job.message))
+            st.rerun()
+
+    tables = dataset_tables(conn, key)
+    if tables:
+        st.caption("Imported tables: " + ", ".join(tables))
@@ -1,10 +1,96 @@
 import streamlit as st
 import sqlite3
-import pandas as pd
+import os
+import tempfile
+from bulk_load import (BULK_LOAD_MAX_ROWS, LOAD_STRATEGIES, ROW_COMMIT_MAX_ROWS, compare_strategies,
+                       generate_employees_file)
+from category import Category
+from limits import QUERY_TIMEOUT_SECONDS
+from sandbox import session_sandbox
 
-def dml_questions(conn, cursor):
-    st.header("SQL DML Practice")
-    
+DML_QUESTIONS = {
+    "insert": [
+        {
+            "question": "Insert a new employee",
+            "solution": """
+                INSERT INTO employees (name, department_id, salary, hire_date)
+                VALUES ('Charlie', 2, 58000, '2024-01-01');
+            """,
+            "explanation": "Basic INSERT statement to add a new employee record."
+        },
+        {
+            "question": "Insert multiple employees in one statement",
+            "solution": """
+                INSERT INTO employees (name, department_id, salary, hire_date)
+                VALUES 
+                    ('David', 1, 62000, '2024-01-15'),
+                    ('Eve', 3, 59000, '2024-01-15');
+            """,
+            "explanation": "INSERT multiple rows in a single statement."
+        }
+    ],
+    "update": [
+        {
+            "question": "Update salary for an employee",
+            "solution": """
+                UPDATE employees
+                SET salary = 65000
+                WHERE name = 'Alice';
+            """,
+            "explanation": "Basic UPDATE statement to modify an employee's salary."
+        },
+        {
+            "question": "Give 10% raise to IT department employees",
+            "solution": """
+                UPDATE employees
+                SET salary = salary * 1.1
+                WHERE department_id = 1;
+            """,
+            "explanation": "UPDATE with calculation and WHERE clause."
+        }
+    ],
+    "delete": [
+        {
+            "question": "Delete an employee by name",
+            "solution": """
+                DELETE FROM employees
+                WHERE name = 'Bob';
+            """,
+            "explanation": "Basic DELETE statement to remove a specific employee."
+        },
+        {
+            "question": "Delete employees with salary below 55000",
+            "solution": """
+                DELETE FROM employees
+                WHERE salary < 55000;
+            """,
+            "explanation": "DELETE with condition based on salary."
+        }
+    ],
+    "select": [
+        {
+            "question": "Select employees with their department names",
+            "solution": """
+                SELECT e.name, d.name as department
+                FROM employees e
+                JOIN departments d ON e.department_id = d.id;
+            """,
+            "explanation": "Basic SELECT with JOIN to show employee and department information."
+        },
+        {
+            "question": "Select department-wise average salary",
+            "solution": """
+                SELECT d.name, AVG(e.salary) as avg_salary
+                FROM departments d
+                LEFT JOIN employees e ON d.id = e.department_id
+                GROUP BY d.name;
+            """,
+            "explanation": "SELECT with aggregation and GROUP BY."
+        }
+    ]
+}
+
+def dml_fixture(cursor):
     # Drop existing tables
     cursor.execute("DROP TABLE IF EXISTS employees")
     cursor.execute("DROP TABLE IF EXISTS departments")
@@ -39,169 +125,74 @@ def dml_questions(conn, cursor):
         [(1, 'John', 1, 60000, '2023-01-01'),
          (2, 'Alice', 2, 55000, '2023-02-01'),
          (3, 'Bob', 1, 65000, '2023-01-15')])
-    
-    conn.commit()
 
-    # Display tables
-    st.subheader("Available Tables:")
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.write("**Employees Table**")
-        cursor.execute("SELECT * FROM employees")
-        df = pd.DataFrame(cursor.fetchall(), 
-                         columns=['id', 'name', 'department_id', 'salary', 'hire_date'])
-        st.dataframe(df)
-    
-    with col2:
-        st.write("**Departments Table**")
-        cursor.execute("SELECT * FROM departments")
-        df = pd.DataFrame(cursor.fetchall(), 
-                         columns=['id', 'name', 'location', 'budget'])
-        st.dataframe(df)
-
-    st.divider()
+def bulk_load_lab(category, selection):
+    st.subheader("Bulk Load")
+    st.write("Stream a CSV or Parquet file into a sandbox table in chunks and "
+             "compare load strategies by throughput.")
 
-    questions = {
-        "insert": [
-            {
-                "question": "Insert a new employee",
-                "solution": """
-                    INSERT INTO employees (name, department_id, salary, hire_date)
-                    VALUES ('Charlie', 2, 58000, '2024-01-01');
-                """,
-                "explanation": "Basic INSERT statement to add a new employee record."
-            },
-            {
-                "question": "Insert multiple employees in one statement",
-                "solution": """
-                    INSERT INTO employees (name, department_id, salary, hire_date)
-                    VALUES 
-                        ('David', 1, 62000, '2024-01-15'),
-                        ('Eve', 3, 59000, '2024-01-15');
-                """,
-                "explanation": "INSERT multiple rows in a single statement."
-            }
-        ],
-        "update": [
-            {
-                "question": "Update salary for an employee",
-                "solution": """
-                    UPDATE employees
-                    SET salary = 65000
-                    WHERE name = 'Alice';
-                """,
-                "explanation": "Basic UPDATE statement to modify an employee's salary."
-            },
-            {
-                "question": "Give 10% raise to IT department employees",
-                "solution": """
-                    UPDATE employees
-                    SET salary = salary * 1.1
-                    WHERE department_id = 1;
-                """,
-                "explanation": "UPDATE with calculation and WHERE clause."
-            }
-        ],
-        "delete": [
-            {
-                "question": "Delete an employee by name",
-                "solution": """
-                    DELETE FROM employees
-                    WHERE name = 'Bob';
-                """,
-                "explanation": "Basic DELETE statement to remove a specific employee."
-            },
-            {
-                "question": "Delete employees with salary below 55000",
-                "solution": """
-                    DELETE FROM employees
-                    WHERE salary < 55000;
-                """,
-                "explanation": "DELETE with condition based on salary."
-            }
-        ],
-        "select": [
-            {
-                "question": "Select employees with their department names",
-                "solution": """
-                    SELECT e.name, d.name as department
-                    FROM employees e
-                    JOIN departments d ON e.department_id = d.id;
-                """,
-                "explanation": "Basic SELECT with JOIN to show employee and department information."
-            },
-            {
-                "question": "Select department-wise average salary",
-                "solution": """
-                    SELECT d.name, AVG(e.salary) as avg_salary
-                    FROM departments d
-                    LEFT JOIN employees e ON d.id = e.department_id
-                    GROUP BY d.name;
-                """,
-                "explanation": "SELECT with aggregation and GROUP BY."
-            }
-        ]
-    }
+    source_type = st.radio("Data source:", ["Generate a file", "Upload a file"], horizontal=True)
+    file_type = st.radio("File format:", ["csv", "parquet"], horizontal=True,
+                         format_func=str.upper)
+    uploaded = None
+    if source_type == "Generate a file":
+        rows = st.number_input("Rows to generate:", min_value=1000, max_value=BULK_LOAD_MAX_ROWS,
+                               value=20000, step=10000)
+    else:
+        uploaded = st.file_uploader("Upload a file:", type=[file_type])
 
-    operation_type = st.selectbox("Select DML Operation:", 
-                                list(questions.keys()), 
-                                format_func=lambda x: x.upper())
-    
-    question_index = st.selectbox("Select Question:", 
-                                range(1, len(questions[operation_type]) + 1), 
-                                format_func=lambda x: f"Question {x}")
-    
-    selected_question = questions[operation_type][question_index - 1]
+    strategies = st.multiselect("Load strategies:", list(LOAD_STRATEGIES.keys()),
+                                default=list(LOAD_STRATEGIES.keys()))
+    index_options = st.multiselect("Indexes:", ["no indexes", "with indexes"],
+                                   default=["no indexes", "with indexes"])
+    chunk_size = st.select_slider("Chunk size (rows):", [1000, 5000, 10000, 50000, 100000],
+                                  value=10000)
+    on_disk = st.checkbox("File-backed sandbox (shows real commit cost)", value=True)
+    st.caption(f"Each run loads at most {BULK_LOAD_MAX_ROWS:,} rows ({ROW_COMMIT_MAX_ROWS:,} when "
+               f"committing every row) and stops after {QUERY_TIMEOUT_SECONDS} seconds; "
+               f"rows per second covers the rows it loaded.")
 
-    st.subheader("Question:")
-    st.write(selected_question["question"])
-    
-    user_query = st.text_area("Enter your SQL query:")
-    
-    if st.button("Submit"):
+    if st.button("Run bulk load"):
+        if uploaded is None and source_type == "Upload a file":
+            st.warning("Upload a file first.")
+            return
         try:
-            cursor.execute(user_query)
-            conn.commit()
-            
-            if operation_type == "select":
-                result = cursor.fetchall()
-                if result:
-                    st.success("Query executed successfully!")
-                    st.write("Result:")
-                    df = pd.DataFrame(result)
-                    st.dataframe(df)
-                else:
-                    st.warning("Query returned no results.")
-            else:
-                st.success("Query executed successfully!")
-                st.write("Updated Tables:")
-                # Show updated data
-                cursor.execute("SELECT * FROM employees")
-                st.write("Employees Table:")
-                df = pd.DataFrame(cursor.fetchall(), 
-                                columns=['id', 'name', 'department_id', 'salary', 'hire_date'])
-                st.dataframe(df)
-                
+            with st.spinner("Loading..."), tempfile.TemporaryDirectory() as tmp:
+                source = uploaded
+                if source is None:
+                    source = os.path.join(tmp, f"employees.{file_type}")
+                    generate_employees_file(source, rows, file_type)
+                st.session_state["bulk_load_results"] = compare_strategies(
+                    source, file_type, strategies,
+                    [option == "with indexes" for option in index_options],
+                    chunk_size, on_disk)
         except Exception as e:
-            st.error(f"Error executing query: {str(e)}")
-    
-    if st.button("Show Solution", key="show_solution"):
-        st.code(selected_question["solution"], language="sql")
-        st.write("Explanation:")
-        st.write(selected_question["explanation"])
+            st.error(f"Error loading file: {str(e)}")
+
+    results = st.session_state.get("bulk_load_results")
+    if results is not None and not results.empty:
+        st.write("**Rows per second**")
+        st.bar_chart(results.pivot(index="strategy", columns="indexes",
+                                   values="rows_per_second"), stack=False)
+        st.dataframe(results)
+
+# SELECT leaves the state unchanged, so the select questions compare rows
+DML_CATEGORY = Category("DML", "SQL DML Practice", dml_fixture, DML_QUESTIONS, grading="state",
+                        type_grading={"select": "result"},
+                        previews=["employees", "departments"], history=True,
+                        type_label="Select DML Operation:", type_format=lambda x: x.upper(),
+                        tools={"Bulk-load mode": bulk_load_lab},
+                        capture_changes=True)
 
 def main():
     st.title("SQL DML Practice App")
-    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn = session_sandbox()
     cursor = conn.cursor()
 
     try:
-        dml_questions(conn, cursor)
+        DML_CATEGORY.render(conn, cursor)
     except sqlite3.Error as e:
         st.error(f"An error occurred: {e}")
 
-    conn.close()
-
 if __name__ == "__main__":
     main()
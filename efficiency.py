@@ -0,0 +1,203 @@
+import streamlit as st
+import sqlite3
+import pandas as pd
+import time
+from fixtures import fixture_image
+from executor import grade, split_statements
+from limits import QUERY_TIMEOUT_SECONDS, apply_limits
+
+# Efficiency of a submission compared with the question's reference solution,
+# both run on a scaled-up copy of the category fixture so that differences in
+# plan show up as differences in work
+SCALE_FACTOR = 200
+STEP_GRANULARITY = 100
+MAX_STEPS = 50_000_000
+
+# Ratios within this band count as "the same work as the reference"
+SAME_WORK_RATIO = 1.5
+
+# Scaled images already built in this process, keyed by (fixture, factor)
+_scaled_images = {}
+
+def _integer_key(conn, table):
+    # The table's INTEGER PRIMARY KEY (rowid alias) column, if it has one
+    info = conn.execute(f'PRAGMA table_info("{table}")').fetchall()
+    keys = [column for column in info if column[5]]
+    if len(keys) == 1 and keys[0][2].upper() == "INTEGER":
+        return keys[0][1]
+    return None
+
+def scale_image(image, factor):
+    # Every table gets factor - 1 extra copies of its rows. Primary keys are
+    # shifted so copies stay unique; other columns (including foreign keys)
+    # are kept, so copies still join to the original rows.
+    if factor <= 1:
+        return image
+    conn = sqlite3.connect(':memory:')
+    conn.deserialize(image)
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+    for table in tables:
+        columns = [column[1] for column in conn.execute(f'PRAGMA table_info("{table}")')]
+        key = _integer_key(conn, table)
+        span = conn.execute(f'SELECT COALESCE(MAX("{key}"), 0) FROM "{table}"').fetchone()[0] if key else 0
+        select = ", ".join(f'"{column}" + copies.k * {span}' if column == key else f'"{column}"'
+                           for column in columns)
+        names = ", ".join(f'"{column}"' for column in columns)
+        try:
+            conn.execute(f"""
+                INSERT INTO "{table}" ({names})
+                WITH RECURSIVE copies(k) AS (SELECT 1 UNION ALL SELECT k + 1 FROM copies WHERE k < {factor - 1})
+                SELECT {select} FROM (SELECT * FROM "{table}") AS "{table}", copies
+            """)
+            conn.commit()
+        except sqlite3.IntegrityError:
+            # Unique columns other than the key: leave this table at its original size
+            conn.rollback()
+    conn.execute("ANALYZE")
+    conn.commit()
+    scaled = conn.serialize()
+    conn.close()
+    return scaled
+
+def scaled_image(fixture, factor=SCALE_FACTOR):
+    key = (fixture.__name__, factor)
+    if key not in _scaled_images:
+        _scaled_images[key] = scale_image(fixture_image(fixture), factor)
+    return _scaled_images[key]
+
+def plan_shape(conn, sql):
+    # EXPLAIN QUERY PLAN of the last statement, plus counts of full scans,
+    # index searches and temporary b-trees (sorts / DISTINCT / GROUP BY)
+    detail = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {split_statements(sql)[-1]}")]
+    return {
+        "plan": detail,
+        "scans": sum(1 for line in detail if line.startswith("SCAN") and "COVERING INDEX" not in line),
+        "searches": sum(1 for line in detail if line.startswith("SEARCH") or "COVERING INDEX" in line),
+        "temp_btrees": sum(1 for line in detail if "TEMP B-TREE" in line),
+    }
+
+def measure_work(image, sql):
+    # VM steps (counted in units of STEP_GRANULARITY by the progress handler)
+    # and wall time of running `sql` to completion on a copy of `image`.
+    # Rows are read and thrown away, and the run is interrupted after
+    # MAX_STEPS steps or QUERY_TIMEOUT_SECONDS.
+    conn = sqlite3.connect(':memory:')
+    conn.deserialize(image)
+    apply_limits(conn)
+    ticks = [0]
+    deadline = time.perf_counter() + QUERY_TIMEOUT_SECONDS
+
+    def count():
+        ticks[0] += 1
+        return ticks[0] * STEP_GRANULARITY > MAX_STEPS or time.perf_counter() > deadline
+
+    conn.set_progress_handler(count, STEP_GRANULARITY)
+    try:
+        start = time.perf_counter()
+        for statement in split_statements(sql):
+            for _ in conn.execute(statement):
+                pass
+        seconds = time.perf_counter() - start
+        conn.set_progress_handler(None, 0)
+        shape = plan_shape(conn, sql)
+    finally:
+        conn.close()
+    return {"steps": max(ticks[0], 1) * STEP_GRANULARITY, "seconds": seconds, **shape}
+
+def verdict(ratio, correct=True):
+    prefix = "correct" if correct else "incorrect"
+    if ratio < 1 / SAME_WORK_RATIO:
+        return f"{prefix} and {1 / ratio:.0f}x less work than the reference"
+    if ratio <= SAME_WORK_RATIO:
+        return f"{prefix}, same work as the reference"
+    return f"{prefix} but {ratio:.0f}x more work than needed"
+
+def measure_bounded(image, sql):
+    # measure_work, or None if the run was interrupted
+    try:
+        return measure_work(image, sql)
+    except sqlite3.OperationalError as e:
+        if "interrupted" not in str(e):
+            raise
+        return None
+
+def score_efficiency(fixture, question, sql, factor=SCALE_FACTOR, correct=True):
+    # work_ratio is None when either query could not be measured
+    image = scaled_image(fixture, factor)
+    limits = f"{MAX_STEPS:,} VM steps or {QUERY_TIMEOUT_SECONDS} seconds"
+    reference = measure_bounded(image, question["solution"])
+    if reference is None:
+        return {"work_ratio": None, "reference": None, "learner": None,
+                "verdict": f"not measurable: the reference solution ran past {limits}"}
+    learner = measure_bounded(image, sql)
+    if learner is None:
+        return {"work_ratio": None, "reference": reference, "learner": None,
+                "verdict": f"not measurable: gave up after {limits}"}
+    ratio = learner["steps"] / reference["steps"]
+    return {
+        "work_ratio": ratio,
+        "time_ratio": learner["seconds"] / reference["seconds"] if reference["seconds"] else None,
+        "verdict": verdict(ratio, correct),
+        "scale_factor": factor,
+        "reference": reference,
+        "learner": learner,
+    }
+
+def efficiency_panel(category, selection):
+    # Grade the current query and compare its work with the reference solution
+    fixture, question, sql, key = category.fixture, selection["question"], selection["sql"], selection["key"]
+    st.subheader("Efficiency Score")
+    scores = st.session_state.setdefault("efficiency_scores", {})
+    if st.button("Score my query", key=f"{key}_score", disabled=not sql.strip()):
+        with st.spinner(f"Running both queries on a {SCALE_FACTOR}x fixture..."):
+            result = grade(fixture, question, sql, "result")
+            if result["error"]:
+                scores[key] = {"error": result["error"]}
+            else:
+                try:
+                    scores[key] = score_efficiency(fixture, question, sql, correct=result["correct"])
+                except sqlite3.Error as e:
+                    scores[key] = {"error": str(e)}
+
+    score = scores.get(key)
+    if score is None:
+        return
+    if "error" in score:
+        st.error(score["error"])
+        return
+    if score["work_ratio"] is None:
+        st.warning(score["verdict"].capitalize())
+        return
+    if score["work_ratio"] <= SAME_WORK_RATIO:
+        st.success(score["verdict"].capitalize())
+    else:
+        st.warning(score["verdict"].capitalize())
+    col1, col2 = st.columns(2)
+    col1.metric("VM steps", f"{score['learner']['steps']:,}",
+                f"{score['work_ratio']:.1f}x reference", delta_color="inverse")
+    col2.metric("Time", f"{score['learner']['seconds'] * 1000:.1f} ms",
+                f"{score['time_ratio']:.1f}x reference" if score["time_ratio"] else None,
+                delta_color="inverse")
+    st.dataframe(pd.DataFrame([
+        {"query": name, "steps": score[name]["steps"], "ms": round(score[name]["seconds"] * 1000, 2),
+         "scans": score[name]["scans"], "searches": score[name]["searches"],
+         "temp b-trees": score[name]["temp_btrees"], "plan": " / ".join(score[name]["plan"])}
+        for name in ("reference", "learner")
+    ]))
+
+def grade_within_budget(fixture, question, sql):
+    # For questions with a "budget": the answer must return the reference's
+    # results using at most budget x the reference's VM steps on the fixture
+    result = grade(fixture, question, sql, "result")
+    if result["error"] or not result["correct"]:
+        return result
+    score = score_efficiency(fixture, question, sql, factor=1)
+    result["efficiency"] = score
+    if score["reference"] is None:
+        # Nothing to hold the answer to: it stays graded on its results
+        result["budget_steps"] = None
+        return result
+    result["budget_steps"] = question["budget"] * score["reference"]["steps"]
+    result["correct"] = score["work_ratio"] is not None and score["work_ratio"] <= question["budget"]
+    return result
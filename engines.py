@@ -0,0 +1,218 @@
+import streamlit as st
+import sqlite3
+import pandas as pd
+import decimal
+import threading
+import time
+from executor import execute_sql, is_ordered, normalize_rows, split_statements
+from efficiency import scaled_image
+from limits import MAX_FETCH_ROWS, QUERY_TIMEOUT_SECONDS, apply_limits, time_limit_error
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Execution engines a category can run learner queries on. Every engine is
+# loaded from the same SQLite sandbox image (fixture, dataset import or
+# undo/redo state) and returns results shaped like executor.execute_sql().
+ENGINE_CHUNK_ROWS = 50000
+
+# Loaded DuckDB databases kept per image; older ones are dropped past this
+MAX_CACHED_DATABASES = 4
+
+# Settings of every DuckDB copy, locked once it is loaded: no file, network
+# or extension access, and a bounded share of the server
+DUCKDB_MEMORY_LIMIT = "256MB"
+DUCKDB_THREADS = 1
+
+# Fixture scale factors offered by the engine comparison
+COMPARISON_FACTORS = [1, 100, 1000, 10000]
+
+# Statement types (as DuckDB parses them, so comments cannot hide them) that
+# would end the query's transaction, or change the shared DuckDB copy, its
+# connection or files outside it. CHECKPOINT parses as CALL.
+_SHARED_STATE = {"TRANSACTION", "SET", "VARIABLE_SET", "PRAGMA", "CALL", "ATTACH", "DETACH", "LOAD",
+                 "EXTENSION", "EXPORT", "COPY", "COPY_DATABASE", "VACUUM"}
+
+class SqliteEngine:
+    name = "SQLite"
+    available = True
+    missing = None
+
+    def execute(self, image, image_key, sql, max_rows=MAX_FETCH_ROWS):
+        # A private copy of the image, so the query cannot change the sandbox
+        conn = sqlite3.connect(':memory:')
+        try:
+            conn.deserialize(image)
+            apply_limits(conn)
+            return execute_sql(conn, sql, max_rows=max_rows)
+        finally:
+            conn.close()
+
+class DuckDBEngine:
+    # Embedded columnar engine. The SQLite image is copied into DuckDB once
+    # per image key and reused by every session; each query runs in a
+    # transaction that is rolled back, so the shared copy never changes.
+    name = "DuckDB"
+    available = duckdb is not None
+    missing = "DuckDB is not installed (pip install duckdb)."
+
+    def __init__(self):
+        self._databases = {}
+        self._lock = threading.Lock()
+
+    def database(self, image, image_key):
+        # Dropped copies are not closed: a query on another thread may still
+        # be using one, and it is freed with its last cursor
+        with self._lock:
+            if image_key is not None and image_key in self._databases:
+                return self._databases[image_key]
+            db = load_duckdb(image)
+            if image_key is not None:
+                self._databases[image_key] = db
+                while len(self._databases) > MAX_CACHED_DATABASES:
+                    del self._databases[next(iter(self._databases))]
+            return db
+
+    def execute(self, image, image_key, sql, max_rows=MAX_FETCH_ROWS):
+        if not split_statements(sql):
+            raise ValueError("No SQL statement to execute")
+        cursor = self.database(image, image_key).cursor()
+        # Stopped after the same time as execute_sql() scripts
+        timer = threading.Timer(QUERY_TIMEOUT_SECONDS, cursor.interrupt)
+        columns, rows, truncated = None, [], False
+        try:
+            statements = cursor.extract_statements(sql)
+            for statement in statements:
+                if statement.type.name in _SHARED_STATE:
+                    raise ValueError(f"{self.name} runs queries on a shared copy of the sandbox; "
+                                     f"transaction control, settings and file statements are not "
+                                     f"allowed ({statement.type.name})")
+            cursor.execute("BEGIN TRANSACTION")
+            timer.start()
+            start = time.perf_counter()
+            for statement in statements:
+                cursor.execute(statement)
+                if cursor.description is not None:
+                    columns = [column[0] for column in cursor.description]
+                    rows = cursor.fetchmany(max_rows)
+                    truncated = bool(cursor.fetchmany(1))
+            seconds = time.perf_counter() - start
+        except duckdb.InterruptException:
+            raise time_limit_error()
+        finally:
+            timer.cancel()
+            try:
+                cursor.execute("ROLLBACK")
+            except (duckdb.TransactionException, duckdb.InterruptException):
+                # No transaction left to roll back; keep the query's own error
+                pass
+            cursor.close()
+        return {
+            "columns": columns,
+            "rows": [tuple(float(v) if isinstance(v, decimal.Decimal) else v for v in row)
+                     for row in rows],
+            "truncated": truncated,
+            "changes": 0,
+            "statements": len(statements),
+            "result_statement": None,
+            "seconds": seconds,
+        }
+
+ENGINES = {engine.name: engine for engine in [SqliteEngine(), DuckDBEngine()]}
+
+def duckdb_type(declared):
+    # Same affinity rules as SQLite; dates stay text, as they are in SQLite
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return "BIGINT"
+    if any(name in declared for name in ("REAL", "FLOA", "DOUB", "DEC", "NUM")):
+        return "DOUBLE"
+    return "VARCHAR"
+
+def load_duckdb(image):
+    # Copy every table of a SQLite image into a new in-memory DuckDB
+    # database, chunk by chunk, with column types from the declared types
+    source = sqlite3.connect(':memory:')
+    db = duckdb.connect(':memory:', config={"memory_limit": DUCKDB_MEMORY_LIMIT, "threads": DUCKDB_THREADS})
+    try:
+        source.deserialize(image)
+        tables = [row[0] for row in source.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")]
+        for table in tables:
+            info = source.execute(f'PRAGMA table_info("{table}")').fetchall()
+            columns = [column[1] for column in info]
+            db.execute(f'CREATE TABLE "{table}" ('
+                       + ", ".join(f'"{column[1]}" {duckdb_type(column[2])}' for column in info) + ")")
+            cursor = source.execute(f'SELECT * FROM "{table}"')
+            while True:
+                rows = cursor.fetchmany(ENGINE_CHUNK_ROWS)
+                if not rows:
+                    break
+                db.register("chunk", pd.DataFrame(rows, columns=columns))
+                db.execute(f'INSERT INTO "{table}" SELECT * FROM chunk')
+                db.unregister("chunk")
+        # Only after loading, which reads the chunks as pandas frames; external
+        # access can be turned off at runtime but never back on
+        db.execute("SET enable_external_access = false")
+        db.execute("SET lock_configuration = true")
+    except Exception:
+        db.close()
+        raise
+    finally:
+        source.close()
+    return db
+
+def engine_choice(category):
+    # Engine picker for categories that declare more than one engine
+    if len(category.engines) < 2:
+        return "SQLite"
+    names = [name for name in category.engines if ENGINES[name].available]
+    for name in category.engines:
+        if not ENGINES[name].available:
+            st.caption(ENGINES[name].missing)
+    if len(names) < 2:
+        return names[0]
+    return st.radio("Engine:", names, horizontal=True, key=f"{category.key}_engine")
+
+def compare_engines(image, image_key, sql, engines, repetitions=3):
+    # Best-of-n time of the query on every engine, and whether the engines
+    # return the same rows as the first one
+    results = []
+    reference = None
+    for name in engines:
+        engine = ENGINES[name]
+        try:
+            engine.execute(image, image_key, sql)  # warm up (loads the DuckDB copy)
+            runs = [engine.execute(image, image_key, sql) for _ in range(repetitions)]
+        except Exception as e:
+            results.append({"engine": name, "rows": None, "ms": None, "matches": None, "error": str(e)})
+            continue
+        rows = normalize_rows(runs[0]["rows"], is_ordered(sql))
+        if reference is None:
+            reference = rows
+        results.append({"engine": name, "rows": len(rows),
+                        "ms": round(min(run["seconds"] for run in runs) * 1000, 2),
+                        "matches": rows == reference, "error": None})
+    return pd.DataFrame(results)
+
+def engine_comparison(category, selection):
+    st.subheader("Engine Comparison")
+    engines = [name for name in category.engines if ENGINES[name].available]
+    for name in category.engines:
+        if not ENGINES[name].available:
+            st.caption(ENGINES[name].missing)
+    st.write("Runs the query on every engine against a scaled copy of the fixture.")
+    factor = st.select_slider("Fixture scale factor:", COMPARISON_FACTORS, value=100,
+                              key=f"{selection['key']}_engine_factor")
+    sql = selection["sql"] if selection["sql"].strip() else selection["question"]["solution"]
+    if st.button("Compare engines", key=f"{selection['key']}_engine_compare"):
+        with st.spinner(f"Running on {', '.join(engines)}..."):
+            image = scaled_image(category.fixture, factor)
+            st.session_state["engine_comparison"] = compare_engines(
+                image, (category.fixture.__name__, factor), sql, engines)
+    results = st.session_state.get("engine_comparison")
+    if results is not None and not results.empty:
+        st.bar_chart(results.set_index("engine")["ms"])
+        st.dataframe(results, hide_index=True)
@@ -0,0 +1,279 @@
+import streamlit as st
+import sqlite3
+import pandas as pd
+import datetime
+import multiprocessing
+import os
+import random
+import re
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from executor import execute_sql, normalize_rows
+from fixtures import fixture_image
+from limits import apply_limits
+
+# Randomized equivalence check: a query that matches the reference solution on
+# the fixture is also run, with the solution, on many small random instances
+# of the fixture's schema. Values are drawn from each column's domain in the
+# fixture (including values next to the fixture's, to separate > from >=), so
+# queries that only fit the sample rows show up as a mismatch. Columns with no
+# duplicates in the fixture keep none, so instances have no duplicate names or
+# ties the fixture does not have.
+EQUIVALENCE_INSTANCES = 32
+INSTANCE_MAX_ROWS = 8
+EQUIVALENCE_SEED = 0
+
+# Instances per worker task; the other tasks stop at their next instance once
+# a mismatch is found
+BATCH_INSTANCES = 4
+MAX_WORKERS = 4
+INSTANCE_TIMEOUT_SECONDS = 1
+MAX_SAMPLE_VALUES = 20
+
+# Draws for a fresh value in a duplicate-free column before the row is left out
+UNIQUE_ATTEMPTS = 20
+
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}$")
+
+# Per-process caches: the template of each fixture, and the reference
+# solution's rows on each instance
+_templates = {}
+_reference_rows = {}
+_pool = {"executors": {}, "manager": None}
+_pool_lock = threading.Lock()
+
+def column_profile(conn, table, column, tables):
+    # How to draw random values for one column, from its values in the fixture
+    name, declared, is_key = column[1], (column[2] or "").upper(), column[5]
+    if is_key and declared == "INTEGER":
+        return {"name": name, "kind": "key"}
+    values = [row[0] for row in conn.execute(
+        f'SELECT DISTINCT "{name}" FROM "{table}" WHERE "{name}" IS NOT NULL LIMIT {MAX_SAMPLE_VALUES}')]
+    nullable = conn.execute(f'SELECT 1 FROM "{table}" WHERE "{name}" IS NULL LIMIT 1').fetchone() is not None
+    count, distinct = conn.execute(f'SELECT COUNT("{name}"), COUNT(DISTINCT "{name}") FROM "{table}"').fetchone()
+    profile = {"name": name, "values": values, "nullable": nullable, "unique": 1 < count == distinct}
+    if name.lower().endswith("_id") and all(isinstance(v, int) for v in values):
+        # References another table's key, or (e.g. manager_id) an earlier row of this one
+        parent = name[:-3].lower()
+        profile["kind"] = "ref" if parent + "s" in tables or parent in tables else "parent"
+    elif values and all(isinstance(v, int) for v in values):
+        profile["kind"] = "int"
+    elif values and all(isinstance(v, (int, float)) for v in values):
+        profile["kind"] = "real"
+    elif values and all(isinstance(v, str) and _DATE.match(v) for v in values):
+        profile["kind"] = "date"
+    else:
+        profile["kind"] = "text"
+    if profile["kind"] in ("int", "real"):
+        profile["low"], profile["high"] = min(values), max(values)
+    elif profile["kind"] == "date":
+        days = [datetime.date.fromisoformat(v).toordinal() for v in values]
+        profile["low"], profile["high"] = min(days), max(days)
+    return profile
+
+def build_template(image):
+    # (empty copy of the image, {table: [column profiles]}) keeping indexes and
+    # views; small enough to send to the workers instead of the fixture
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.deserialize(image)
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        names = {table.lower() for table in tables}
+        profiles = {table: [column_profile(conn, table, column, names)
+                            for column in conn.execute(f'PRAGMA table_info("{table}")')]
+                    for table in tables}
+        for table in tables:
+            conn.execute(f'DELETE FROM "{table}"')
+        conn.commit()
+        conn.execute("VACUUM")
+        return conn.serialize(), profiles
+    finally:
+        conn.close()
+
+def fixture_template(fixture):
+    if fixture.__name__ not in _templates:
+        _templates[fixture.__name__] = build_template(fixture_image(fixture))
+    return _templates[fixture.__name__]
+
+def _number(profile, rng):
+    low, high = profile["low"], profile["high"]
+    pick = rng.random()
+    if pick < 0.4:
+        value = rng.choice(profile["values"]) if profile["kind"] != "date" else rng.randint(low, high)
+    elif pick < 0.6:
+        base = rng.choice(profile["values"])
+        base = datetime.date.fromisoformat(base).toordinal() if profile["kind"] == "date" else base
+        value = base + rng.choice((-1, 1))
+    else:
+        span = max(high - low, 1)
+        value = rng.uniform(low - span / 2, high + span / 2)
+        value = round(value, 2) if profile["kind"] == "real" else int(value)
+    if profile["kind"] == "date":
+        return datetime.date.fromordinal(int(value)).isoformat()
+    return value
+
+def random_value(profile, rng, row_id):
+    kind = profile["kind"]
+    if kind == "key":
+        return row_id
+    if profile["nullable"] and rng.random() < 0.15:
+        return None
+    if kind == "ref":
+        # Sometimes past the other table's last key, so some rows do not join
+        return rng.randint(1, INSTANCE_MAX_ROWS + 1)
+    if kind == "parent":
+        # Earlier rows only, so hierarchies have no cycles
+        return rng.randint(1, row_id - 1) if row_id > 1 else None
+    if kind == "text":
+        if profile["values"] and rng.random() < 0.8:
+            return rng.choice(profile["values"])
+        return f"{profile['name']}_{rng.randint(1, 99)}"
+    return _number(profile, rng)
+
+def random_row(columns, rng, row_id, used):
+    # One row, or None when a column with no duplicates in the fixture cannot
+    # get a value it has not had yet
+    row = []
+    for profile in columns:
+        for _ in range(UNIQUE_ATTEMPTS):
+            value = random_value(profile, rng, row_id)
+            if not profile.get("unique") or value not in used[profile["name"]]:
+                break
+        else:
+            return None
+        if profile.get("unique"):
+            used[profile["name"]].add(value)
+        row.append(value)
+    return tuple(row)
+
+def random_instance(template, seed, max_rows=INSTANCE_MAX_ROWS):
+    # Image of one random instance; the same seed always gives the same rows
+    empty, profiles = template
+    rng = random.Random(seed)
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.deserialize(empty)
+        for table, columns in profiles.items():
+            used = {profile["name"]: set() for profile in columns}
+            rows = []
+            for row_id in range(1, rng.randint(0, max_rows) + 1):
+                row = random_row(columns, rng, row_id, used)
+                if row is not None:
+                    rows.append(row)
+            names = ", ".join(f'"{profile["name"]}"' for profile in columns)
+            marks = ", ".join("?" for _ in columns)
+            # Random values may break a UNIQUE or CHECK constraint; those rows are left out
+            conn.executemany(f'INSERT OR IGNORE INTO "{table}" ({names}) VALUES ({marks})', rows)
+        conn.commit()
+        return conn.serialize()
+    finally:
+        conn.close()
+
+def instance_tables(template, seed):
+    # The instance's tables as DataFrames, for showing a counterexample
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.deserialize(random_instance(template, seed))
+        return {table: pd.read_sql_query(f'SELECT * FROM "{table}"', conn) for table in template[1]}
+    finally:
+        conn.close()
+
+def run_instance(image, sql):
+    # Rows as a multiset: row order is already checked on the fixture, and
+    # random instances have ties the question's ORDER BY does not settle
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.deserialize(image)
+        apply_limits(conn)
+        return normalize_rows(execute_sql(conn, sql, timeout=INSTANCE_TIMEOUT_SECONDS)["rows"], False)
+    finally:
+        conn.close()
+
+def check_instances(name, template, solution, sql, seeds, stop=None):
+    # First seed on which the query and the solution differ, as
+    # {"seed", "expected", "actual", "error"}, or None. Instances the solution
+    # itself fails on (say, by timing out) are skipped; so is the rest of the
+    # batch once `stop` is set.
+    for seed in seeds:
+        if stop is not None and stop.is_set():
+            return None
+        instance = random_instance(template, seed)
+        reference_key = (name, solution, seed)
+        if reference_key not in _reference_rows:
+            try:
+                _reference_rows[reference_key] = run_instance(instance, solution)
+            except (sqlite3.Error, ValueError):
+                _reference_rows[reference_key] = None
+        expected = _reference_rows[reference_key]
+        if expected is None:
+            continue
+        try:
+            actual, error = run_instance(instance, sql), None
+        except (sqlite3.Error, ValueError) as e:
+            actual, error = None, str(e)
+        if actual != expected:
+            return {"seed": seed, "expected": expected, "actual": actual, "error": error}
+    return None
+
+def worker_pool(workers):
+    # One pool per process and worker count (at most MAX_WORKERS of them),
+    # started on first use and reused by every grade. Pools are never shut
+    # down, since another session's grade may still be submitting to one.
+    # Workers are started from a fresh interpreter, not forked from the app's
+    # threads; the manager hands out the stop events. Sessions grade on their
+    # own threads, so the check-and-create runs under _pool_lock.
+    with _pool_lock:
+        executor = _pool["executors"].get(workers)
+        if executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            if _pool["manager"] is None:
+                _pool["manager"] = context.Manager()
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pool["executors"][workers] = executor
+        return executor, _pool["manager"]
+
+def find_counterexample(fixture, solution, sql, instances=EQUIVALENCE_INSTANCES, workers=None,
+                        seed=EQUIVALENCE_SEED):
+    template = fixture_template(fixture)
+    seeds = list(range(seed, seed + instances))
+    workers = min(workers or os.cpu_count() or 1, MAX_WORKERS)
+    if workers == 1:
+        return check_instances(fixture.__name__, template, solution, sql, seeds)
+    pool, manager = worker_pool(workers)
+    stop = manager.Event()
+    pending = {pool.submit(check_instances, fixture.__name__, template, solution, sql,
+                           seeds[i:i + BATCH_INSTANCES], stop)
+               for i in range(0, len(seeds), BATCH_INSTANCES)}
+    found = None
+    try:
+        while pending and found is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            mismatches = [future.result() for future in done if future.result() is not None]
+            if mismatches:
+                found = min(mismatches, key=lambda mismatch: mismatch["seed"])
+    finally:
+        # Queued batches are cancelled; running ones return at their next instance
+        stop.set()
+        for future in pending:
+            future.cancel()
+    return found
+
+def show_counterexample(category, counterexample):
+    seed = counterexample["seed"]
+    st.info(f"Matches on the sample data, but gives different rows on randomized instance #{seed} "
+            f"(the same tables with other rows). Check that the query answers the question for any "
+            f"data, not only the sample rows.")
+    if counterexample["error"]:
+        st.error(f"On that instance your query fails: {counterexample['error']}")
+    with st.expander(f"Randomized instance #{seed}"):
+        for table, df in instance_tables(fixture_template(category.fixture), seed).items():
+            st.write(f"**{table}**")
+            st.dataframe(df, hide_index=True)
+        col1, col2 = st.columns(2)
+        col1.write(f"Expected rows: {len(counterexample['expected'])}")
+        col1.dataframe(pd.DataFrame(counterexample["expected"]), hide_index=True)
+        if counterexample["actual"] is not None:
+            col2.write(f"Your rows: {len(counterexample['actual'])}")
+            col2.dataframe(pd.DataFrame(counterexample["actual"]), hide_index=True)
@@ -0,0 +1,233 @@
+import hashlib
+import inspect
+import json
+import os
+import re
+import sqlite3
+import time
+from fixtures import bump_data_version, fixture_version, load_fixture
+from sandbox import create_sandbox
+from limits import MAX_FETCH_ROWS, PROGRESS_STEPS, QUERY_TIMEOUT_SECONDS, limit_error
+
+# Column defaults that differ between two otherwise identical runs
+_VOLATILE_DEFAULTS = {"CURRENT_TIMESTAMP", "CURRENT_DATE", "CURRENT_TIME"}
+
+# Graded outcome of each reference solution, keyed by (fixture, solution,
+# mode, probes); fixtures are deterministic, so it never changes
+_expected = {}
+
+# Reference outcomes precomputed by verify_solutions.py, keyed by solution_key()
+SOLUTIONS_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "questions.db")
+_stored = {"mtime": None, "outcomes": {}}
+
+def split_statements(script):
+    # Split on ';' only where it completes a statement (not inside strings or triggers)
+    statements = []
+    current = ""
+    for piece in script.split(";"):
+        current += piece + ";"
+        if sqlite3.complete_statement(current):
+            statement = _strip_comments(current).strip().rstrip(";").strip()
+            if statement:
+                statements.append(statement)
+            current = ""
+    rest = _strip_comments(current).strip().rstrip(";").strip()
+    if rest:
+        statements.append(rest)
+    return statements
+
+def _strip_comments(sql):
+    return "\n".join(line for line in sql.splitlines() if not line.strip().startswith("--"))
+
+def execute_sql(conn, sql, max_rows=MAX_FETCH_ROWS, timeout=QUERY_TIMEOUT_SECONDS):
+    # Run one or more statements and return the rows (at most max_rows) of the
+    # last statement that produced a result set. The whole script is
+    # interrupted once it has run for `timeout` seconds.
+    statements = split_statements(sql)
+    if not statements:
+        raise ValueError("No SQL statement to execute")
+
+    changes_before = conn.total_changes
+    schema_before = conn.execute("PRAGMA schema_version").fetchone()[0]
+    columns, rows, truncated, result_statement = None, [], False, None
+    start = time.perf_counter()
+    deadline = start + timeout
+    conn.set_progress_handler(lambda: time.perf_counter() > deadline, PROGRESS_STEPS)
+    try:
+        for index, statement in enumerate(statements):
+            cursor = conn.execute(statement)
+            if cursor.description is not None:
+                result_statement = index
+                columns = [column[0] for column in cursor.description]
+                rows = cursor.fetchmany(max_rows)
+                truncated = cursor.fetchone() is not None
+        if conn.in_transaction:
+            conn.commit()
+    except Exception as e:
+        # Roll back what is still uncommitted. DDL run outside a transaction
+        # and anything before an explicit COMMIT in the script stay applied.
+        if conn.in_transaction:
+            conn.rollback()
+        error = limit_error(e) if isinstance(e, sqlite3.Error) else None
+        if error is not None:
+            raise error from e
+        raise
+    finally:
+        conn.set_progress_handler(None, 0)
+        # Cached previews (and fragment reruns, see Category.refresh_sandbox)
+        # treat the sandbox as unchanged until the version moves, so bump it
+        # whenever data or schema changed, even if the script then failed
+        if (conn.total_changes != changes_before
+                or conn.execute("PRAGMA schema_version").fetchone()[0] != schema_before):
+            bump_data_version(conn)
+
+    return {
+        "columns": columns,
+        "rows": rows,
+        "truncated": truncated,
+        "changes": conn.total_changes - changes_before,
+        "statements": len(statements),
+        "result_statement": result_statement,
+        "seconds": time.perf_counter() - start,
+    }
+
+def fresh_sandbox(fixture):
+    conn = create_sandbox()
+    load_fixture(conn, fixture)
+    return conn
+
+def is_ordered(sql):
+    # True if the outermost query has an ORDER BY (ignoring ORDER BY inside
+    # OVER (...) or subqueries)
+    flat = sql
+    while True:
+        reduced = re.sub(r"\([^()]*\)", "", flat)
+        if reduced == flat:
+            break
+        flat = reduced
+    return re.search(r"\bORDER\s+BY\b", flat, re.IGNORECASE) is not None
+
+def _normalize_value(value):
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+def normalize_rows(rows, ordered):
+    rows = [tuple(_normalize_value(v) for v in row) for row in rows]
+    return rows if ordered else sorted(rows, key=repr)
+
+def database_state(conn):
+    # Order-independent description of every table (columns and rows) and
+    # index (table and columns), ignoring columns filled from the clock
+    state = []
+    objects = conn.execute("""
+        SELECT type, name, tbl_name FROM sqlite_master
+        WHERE type IN ('table', 'index') AND name NOT LIKE 'sqlite_%'
+        ORDER BY type, tbl_name, name
+    """).fetchall()
+    for obj_type, name, table in objects:
+        if obj_type == "table":
+            info = conn.execute(f'PRAGMA table_info("{name}")').fetchall()
+            columns = [column[1] for column in info
+                       if str(column[4]).upper() not in _VOLATILE_DEFAULTS]
+            select = ", ".join(f'"{column}"' for column in columns)
+            rows = conn.execute(f'SELECT {select} FROM "{name}"').fetchall() if columns else []
+            state.append(("table", name, tuple(columns), tuple(normalize_rows(rows, False))))
+        else:
+            columns = [row[2] for row in conn.execute(f'PRAGMA index_info("{name}")')]
+            state.append(("index", table, tuple(columns)))
+    return sorted(state, key=repr)
+
+def run_for_grading(fixture, sql, mode, probes=(), setup=None):
+    # Outcome of running `sql` on a fresh copy of the fixture (after the
+    # question's setup script, if any): the normalized result set ("result"
+    # mode) or the database state after the script and any probe statements
+    # ("state" mode)
+    conn = fresh_sandbox(fixture)
+    try:
+        if setup:
+            execute_sql(conn, setup)
+        result = execute_sql(conn, sql)
+        if result["truncated"]:
+            raise ValueError(f"The query returns more than {MAX_FETCH_ROWS:,} rows")
+        if mode == "result":
+            return {"rows": normalize_rows(result["rows"], is_ordered(sql)),
+                    "row_count": len(result["rows"]), "seconds": result["seconds"]}
+        probe_errors = []
+        for probe in probes:
+            try:
+                execute_sql(conn, probe)
+            except sqlite3.Error as e:
+                probe_errors.append(str(e))
+        return {"rows": database_state(conn) + [("probe_errors", tuple(probe_errors))],
+                "row_count": result["changes"], "seconds": result["seconds"]}
+    finally:
+        conn.close()
+
+def result_hash(rows):
+    # Digest of a normalized result set or database state
+    return hashlib.sha256(repr(rows).encode()).hexdigest()
+
+# Code that shapes a recorded outcome, so changing it invalidates the records
+_NORMALIZATION_SOURCE = "".join(inspect.getsource(function) for function in (
+    is_ordered, _normalize_value, normalize_rows, database_state, run_for_grading, result_hash))
+
+def solution_key(fixture, solution, mode, probes=(), setup=None):
+    # Changes whenever the solution, the fixture code, the mode, the probes,
+    # the question's setup, the normalization code or the SQLite version do
+    return hashlib.sha256(json.dumps([fixture_version(fixture), solution, mode, list(probes), setup,
+                                      _NORMALIZATION_SOURCE, sqlite3.sqlite_version]).encode()).hexdigest()
+
+def stored_outcomes(path=SOLUTIONS_DB_PATH):
+    # Outcomes recorded by the verifier; re-read whenever the file changes
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return {}
+    if _stored["mtime"] != mtime:
+        try:
+            conn = sqlite3.connect(path)
+            try:
+                rows = conn.execute(
+                    "SELECT solution_key, result_hash, row_count, error FROM solution_results").fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            rows = []
+        _stored["outcomes"] = {key: {"hash": digest, "row_count": row_count, "error": error}
+                               for key, digest, row_count, error in rows}
+        _stored["mtime"] = mtime
+    return _stored["outcomes"]
+
+def expected_outcome(fixture, solution, mode, probes=(), setup=None):
+    # {"hash", "row_count", "error"} of the reference solution: from this
+    # process's cache, then the verifier's results, else by running it
+    key = (fixture.__name__, solution, mode, tuple(probes), setup)
+    if key not in _expected:
+        outcome = stored_outcomes().get(solution_key(fixture, solution, mode, probes, setup))
+        if outcome is None:
+            result = run_for_grading(fixture, solution, mode, probes, setup)
+            outcome = {"hash": result_hash(result["rows"]), "row_count": result["row_count"],
+                       "error": None}
+        _expected[key] = outcome
+    return _expected[key]
+
+def grade(fixture, question, sql, mode, probes=()):
+    try:
+        expected = expected_outcome(fixture, question["solution"], mode, probes, question.get("setup"))
+    except (sqlite3.Error, ValueError) as e:
+        return {"correct": False, "error": f"Reference solution failed: {e}"}
+    if expected["error"]:
+        return {"correct": False, "error": f"Reference solution failed: {expected['error']}"}
+    try:
+        actual = run_for_grading(fixture, sql, mode, probes, question.get("setup"))
+    except (sqlite3.Error, ValueError) as e:
+        return {"correct": False, "error": str(e)}
+
+    return {
+        "correct": result_hash(actual["rows"]) == expected["hash"],
+        "error": None,
+        "expected_row_count": expected["row_count"],
+        "row_count": actual["row_count"],
+        "seconds": actual["seconds"],
+    }
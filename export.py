@@ -0,0 +1,147 @@
+import streamlit as st
+import sqlite3
+import csv
+import functools
+import io
+import time
+from executor import split_statements
+from limits import PROGRESS_STEPS, QUERY_TIMEOUT_SECONDS, SandboxLimitError, apply_limits, limit_error
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Rows fetched and written per step, so the rows are never all in memory at
+# once (the finished file is; see export_result)
+EXPORT_CHUNK_ROWS = 10000
+
+# An export stops with an error past either ceiling, or once the script and
+# the writing have taken QUERY_TIMEOUT_SECONDS, like a submit
+EXPORT_MAX_ROWS = 1000000
+EXPORT_MAX_BYTES = 64 * 2**20
+
+EXPORT_FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+def stream_result(image, sql, result_statement, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Re-run the script on a private copy of the sandbox image and yield the
+    # column names, then lists of at most chunk_rows rows, of the statement
+    # whose result was shown
+    conn = sqlite3.connect(':memory:')
+    deadline = time.perf_counter() + QUERY_TIMEOUT_SECONDS
+    conn.set_progress_handler(lambda: time.perf_counter() > deadline, PROGRESS_STEPS)
+    try:
+        conn.deserialize(image)
+        apply_limits(conn)
+        statements = split_statements(sql)
+        for statement in statements[:result_statement]:
+            for _ in conn.execute(statement):
+                pass
+        cursor = conn.execute(statements[result_statement])
+        yield [column[0] for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield rows
+    except sqlite3.Error as e:
+        error = limit_error(e)
+        if error is not None:
+            raise error from e
+        raise
+    finally:
+        conn.close()
+
+def capped(chunks, out, max_rows=EXPORT_MAX_ROWS, max_bytes=EXPORT_MAX_BYTES):
+    # Pass the chunks on until the export would pass a ceiling
+    yield next(chunks)
+    written = 0
+    for rows in chunks:
+        written += len(rows)
+        if written > max_rows or out.tell() > max_bytes:
+            raise SandboxLimitError(
+                f"Export limit reached: downloads stop at {max_rows:,} rows or "
+                f"{max_bytes / 2**20:.0f} MB. Add a LIMIT or a filter to export less.")
+        yield rows
+
+def write_csv(chunks, out):
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(next(chunks))
+    for rows in chunks:
+        writer.writerows(rows)
+    text.flush()
+    text.detach()
+
+def _arrow_type(values):
+    # SQLite columns have no fixed type; pick one from the first chunk
+    kinds = {type(value) for value in values if value is not None}
+    if kinds <= {int}:
+        return pa.int64() if kinds else pa.string()
+    if kinds <= {int, float}:
+        return pa.float64()
+    if kinds <= {bytes}:
+        return pa.binary()
+    return pa.string()
+
+def _arrow_table(rows, schema):
+    arrays = []
+    for field, values in zip(schema, zip(*rows)):
+        if field.type == pa.string():
+            values = [None if value is None else str(value) for value in values]
+        try:
+            arrays.append(pa.array(values, type=field.type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            raise ValueError(f"Column '{field.name}' changes type partway through the result; "
+                             f"export it as CSV instead")
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def write_parquet(chunks, out):
+    if pq is None:
+        raise RuntimeError("Parquet support requires pyarrow")
+    columns = next(chunks)
+    writer = None
+    try:
+        for rows in chunks:
+            if writer is None:
+                schema = pa.schema([(name, _arrow_type(values))
+                                    for name, values in zip(columns, zip(*rows))])
+                writer = pq.ParquetWriter(out, schema)
+            writer.write_table(_arrow_table(rows, schema))
+        if writer is None:
+            writer = pq.ParquetWriter(out, pa.schema([(name, pa.string()) for name in columns]))
+    finally:
+        if writer is not None:
+            writer.close()
+
+def export_result(image, sql, result_statement, file_type):
+    # Called by the download button when clicked. Not flat in memory:
+    # Streamlit serves downloads from bytes it keeps, so the whole finished
+    # file is built in memory (the rows themselves are only one chunk at a time).
+    out = io.BytesIO()
+    chunks = capped(stream_result(image, sql, result_statement), out)
+    if file_type == "csv":
+        write_csv(chunks, out)
+    else:
+        write_parquet(chunks, out)
+    return out.getvalue()
+
+def export_buttons(image, sql, result, key):
+    # Download buttons for the full result of a submitted query (the table
+    # above may be truncated). The export is only produced when clicked.
+    if result["columns"] is None:
+        return
+    cols = st.columns(len(EXPORT_FORMATS))
+    for col, (file_type, mime) in zip(cols, EXPORT_FORMATS.items()):
+        if file_type == "parquet" and pq is None:
+            continue
+        col.download_button(
+            f"Download {file_type.upper()}",
+            functools.partial(export_result, image, sql, result["result_statement"], file_type),
+            file_name=f"{key}.{file_type}", mime=mime, key=f"{key}_export_{file_type}",
+            on_click="ignore")
+    # A failed download only says so in the browser, so the limits are stated here
+    st.caption(f"Downloads stop at {EXPORT_MAX_ROWS:,} rows, {EXPORT_MAX_BYTES / 2**20:.0f} MB "
+               f"or {QUERY_TIMEOUT_SECONDS} seconds.")
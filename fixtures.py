@@ -0,0 +1,127 @@
+import hashlib
+import inspect
+import itertools
+import json
+import os
+import sqlite3
+from limits import apply_limits
+from sandbox import SandboxConnection, apply_profile
+
+# Serialized SQLite images of each category fixture, stored next to questions.db
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+MANIFEST_PATH = os.path.join(FIXTURE_DIR, "manifest.json")
+MOCK_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_data.sql")
+
+# Images already read in this process, keyed by fixture name
+_images = {}
+
+# Sandbox connections carry a data version, (base, edit), where base names
+# the image the sandbox was loaded from and edit is 0 until a statement
+# changes it. Edits get process-unique numbers, so two sandboxes never share a
+# version unless they hold the same loaded image. Plain connections (scratch
+# copies for grading, replay and the other engines) have none.
+_edits = itertools.count(1)
+
+def mock_data_fixture(cursor):
+    with open(MOCK_DATA_PATH) as f:
+        cursor.executescript(f.read())
+
+def fixture_version(fixture):
+    # Changes whenever the fixture code (or the mock data script) changes
+    digest = hashlib.sha256(inspect.getsource(fixture).encode())
+    if fixture is mock_data_fixture:
+        with open(MOCK_DATA_PATH, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def build_image(fixture):
+    conn = sqlite3.connect(':memory:')
+    fixture(conn.cursor())
+    conn.commit()
+    conn.execute("VACUUM")
+    image = conn.serialize()
+    conn.close()
+    return image
+
+def image_path(fixture):
+    return os.path.join(FIXTURE_DIR, f"{fixture.__name__}.db")
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_images(fixtures):
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    manifest = _read_manifest()
+    for fixture in fixtures:
+        image = build_image(fixture)
+        with open(image_path(fixture), "wb") as f:
+            f.write(image)
+        manifest[fixture.__name__] = fixture_version(fixture)
+        _images[fixture.__name__] = image
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+def fixture_image(fixture):
+    # Bytes of the fixture database: process cache, then the prebuilt file if it
+    # matches the current fixture code, otherwise built on the spot
+    image = _images.get(fixture.__name__)
+    if image is not None:
+        return image
+    if _read_manifest().get(fixture.__name__) == fixture_version(fixture):
+        try:
+            with open(image_path(fixture), "rb") as f:
+                image = f.read()
+        except OSError:
+            image = None
+    if image is None:
+        image = build_image(fixture)
+    _images[fixture.__name__] = image
+    return image
+
+def set_data_version(conn, base):
+    if isinstance(conn, SandboxConnection):
+        conn.version = (base, 0)
+
+def bump_data_version(conn):
+    if isinstance(conn, SandboxConnection):
+        conn.version = (conn.version[0] if conn.version else None, next(_edits))
+
+def data_version(conn):
+    # None when the connection was not loaded through this module
+    version = getattr(conn, "version", None)
+    if version is None or version[0] is None:
+        return None
+    return version
+
+def clear_temp_schema(conn):
+    # deserialize() only replaces main; tables, views and triggers created in
+    # temp would otherwise survive every reload and shadow the new tables
+    objects = conn.execute("""
+        SELECT type, name FROM temp.sqlite_master
+        WHERE type IN ('table', 'view', 'trigger') AND name NOT LIKE 'sqlite_%'
+    """).fetchall()
+    for obj_type, name in objects:
+        conn.execute(f'DROP {obj_type.upper()} IF EXISTS temp."{name}"')
+
+def load_image(conn, image, version):
+    # Replace the connection's database (main and temp) with a copy of `image`
+    conn.commit()
+    clear_temp_schema(conn)
+    conn.deserialize(image)
+    # deserialize() resets synchronous, cache_size and the other PRAGMAs
+    apply_profile(conn, getattr(conn, "profile", "Default"))
+    apply_limits(conn)
+    set_data_version(conn, version)
+
+def load_fixture(conn, fixture):
+    # Replace the connection's main database with a copy of the fixture image
+    if not hasattr(conn, "deserialize"):
+        fixture(conn.cursor())
+        conn.commit()
+        set_data_version(conn, fixture.__name__)
+        return
+    load_image(conn, fixture_image(fixture), fixture.__name__)
@@ -0,0 +1,172 @@
+import streamlit as st
+import hashlib
+import itertools
+from fixtures import load_fixture, load_image, set_data_version
+
+# Memory budget shared by all of a session's undo/redo histories (one per
+# category), and the state limit of each history
+HISTORY_BUDGET_BYTES = 16 * 2**20
+HISTORY_MAX_STATES = 50
+
+# Last-use stamps, comparable across the histories sharing a budget
+_clock = itertools.count(1)
+
+class SandboxHistory:
+    # Undo/redo stack of serialized sandbox images. Images are split into
+    # pages and stored content-addressed, so states that share most of their
+    # pages cost little more than one copy. Histories in the same `group`
+    # share one memory budget. When over the budget, the least recently used
+    # state of any history in the group (never a current one) is evicted;
+    # over the state limit, the least recently used state of this one.
+
+    def __init__(self, budget_bytes=HISTORY_BUDGET_BYTES, max_states=HISTORY_MAX_STATES, group=None):
+        self.budget_bytes = budget_bytes
+        self.max_states = max_states
+        self.states = []
+        self.position = -1
+        self.pages = {}
+        self.refcounts = {}
+        self.memory_bytes = 0
+        self.group = group if group is not None else []
+        self.group.append(self)
+
+    def __len__(self):
+        return len(self.states)
+
+    @property
+    def group_bytes(self):
+        return sum(history.memory_bytes for history in self.group)
+
+    @property
+    def can_undo(self):
+        return self.position > 0
+
+    @property
+    def can_redo(self):
+        return self.position < len(self.states) - 1
+
+    def record(self, conn):
+        # Capture the connection's current state; returns False if unchanged
+        conn.commit()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        image = conn.serialize()
+        hashes = []
+        for offset in range(0, len(image), page_size):
+            hashes.append(self._store(image[offset:offset + page_size]))
+        hashes = tuple(hashes)
+
+        if self.position >= 0 and self.states[self.position]["pages"] == hashes:
+            for page_hash in hashes:
+                self._release(page_hash)
+            set_data_version(conn, self.version())
+            return False
+
+        for state in self.states[self.position + 1:]:
+            self._drop(state)
+        del self.states[self.position + 1:]
+
+        self.states.append({"pages": hashes, "used": self._tick()})
+        self.position = len(self.states) - 1
+        self._evict()
+        # The connection now holds exactly the recorded state
+        set_data_version(conn, self.version())
+        return True
+
+    def current_image(self):
+        state = self.states[self.position]
+        state["used"] = self._tick()
+        return b"".join(self.pages[page_hash] for page_hash in state["pages"])
+
+    def version(self):
+        # Identifies the current state's content, whichever session holds it
+        return hashlib.blake2b(b"".join(self.states[self.position]["pages"]), digest_size=16).hexdigest()
+
+    def undo(self):
+        self.position -= 1
+        return self.current_image()
+
+    def redo(self):
+        self.position += 1
+        return self.current_image()
+
+    def clear(self):
+        for state in self.states:
+            self._drop(state)
+        self.states = []
+        self.position = -1
+
+    def _tick(self):
+        return next(_clock)
+
+    def _store(self, page):
+        page_hash = hashlib.blake2b(page, digest_size=16).digest()
+        if page_hash in self.refcounts:
+            self.refcounts[page_hash] += 1
+        else:
+            self.pages[page_hash] = page
+            self.refcounts[page_hash] = 1
+            self.memory_bytes += len(page)
+        return page_hash
+
+    def _release(self, page_hash):
+        self.refcounts[page_hash] -= 1
+        if not self.refcounts[page_hash]:
+            self.memory_bytes -= len(self.pages.pop(page_hash))
+            del self.refcounts[page_hash]
+
+    def _drop(self, state):
+        for page_hash in state["pages"]:
+            self._release(page_hash)
+
+    def _evict(self):
+        while True:
+            if len(self.states) > self.max_states:
+                candidates = [self]
+            elif self.group_bytes > self.budget_bytes:
+                candidates = self.group
+            else:
+                return
+            evictable = [(history.states[i]["used"], n, i) for n, history in enumerate(candidates)
+                         for i in range(len(history.states)) if i != history.position]
+            if not evictable:
+                return
+            _, n, index = min(evictable)
+            candidates[n]._remove(index)
+
+    def _remove(self, index):
+        self._drop(self.states.pop(index))
+        if index < self.position:
+            self.position -= 1
+
+def history_sandbox(conn, key, fixture):
+    # Restore the session's current sandbox state (the fixture on first use).
+    # Returns the history so the caller can record new states after a
+    # successful Submit.
+    history = st.session_state.get(f"history_{key}")
+    if history is None:
+        history = SandboxHistory(group=st.session_state.setdefault("history_group", []))
+        st.session_state[f"history_{key}"] = history
+
+    if not len(history):
+        load_fixture(conn, fixture)
+        history.record(conn)
+    else:
+        load_image(conn, history.current_image(), history.version())
+    return history
+
+def history_controls(conn, history, fixture):
+    # Undo / Redo / Reset buttons; they change the sandbox in place, so
+    # anything drawn after them shows the new state
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 3])
+    if col1.button("Undo", disabled=not history.can_undo):
+        load_image(conn, history.undo(), history.version())
+    if col2.button("Redo", disabled=not history.can_redo):
+        load_image(conn, history.redo(), history.version())
+    if col3.button("Reset"):
+        history.clear()
+        load_fixture(conn, fixture)
+        history.record(conn)
+    col4.caption(f"State {history.position + 1} of {len(history)} · "
+                 f"{history.memory_bytes / 2**10:.0f} KB here, "
+                 f"{history.group_bytes / 2**10:.0f} KB of the "
+                 f"{history.budget_bytes / 2**20:.0f} MB history budget across all categories")
@@ -1,10 +1,323 @@
 import streamlit as st
 import sqlite3
 import pandas as pd
+import itertools
+import random
+import re
+from efficiency import MAX_STEPS, efficiency_panel, measure_work
+from category import Category
+from sandbox import session_sandbox
 
-def joins_questions(conn, cursor):
-    st.header("SQL JOIN Practice")
-    
+JOIN_QUESTIONS = {
+    "inner_join": [
+        {
+            "question": "List all employees with their department names",
+            "solution": """
+                SELECT e.name AS employee_name, d.name AS department_name
+                FROM employees e
+                INNER JOIN departments d ON e.department_id = d.id
+            """,
+            "explanation": "This query uses an INNER JOIN to match employees with their departments, showing only employees who have a department assigned."
+        },
+        {
+            "question": "Show all projects with their associated department names",
+            "solution": """
+                SELECT p.name AS project_name, d.name AS department_name
+                FROM projects p
+                INNER JOIN departments d ON p.department_id = d.id
+            """,
+            "explanation": "This INNER JOIN connects projects to their respective departments, displaying only projects that have a department assigned."
+        },
+        {
+            "question": "List employees, their departments, and assigned projects",
+            "solution": """
+                SELECT e.name AS employee_name, d.name AS department_name, p.name AS project_name
+                FROM employees e
+                INNER JOIN departments d ON e.department_id = d.id
+                INNER JOIN projects p ON d.id = p.department_id
+            """,
+            "explanation": "This query uses two INNER JOINs to connect employees with their departments and the projects assigned to those departments."
+        }
+    ],
+    "left_join": [
+        {
+            "question": "List all employees and their department names (if any)",
+            "solution": """
+                SELECT e.name AS employee_name, d.name AS department_name
+                FROM employees e
+                LEFT JOIN departments d ON e.department_id = d.id
+            """,
+            "explanation": "This LEFT JOIN returns all employees, including those without a department (which will show as NULL for department_name)."
+        },
+        {
+            "question": "Show all departments and the number of employees in each",
+            "solution": """
+                SELECT d.name AS department_name, COUNT(e.id) AS employee_count
+                FROM departments d
+                LEFT JOIN employees e ON d.id = e.department_id
+                GROUP BY d.id, d.name
+            """,
+            "explanation": "This LEFT JOIN ensures all departments are listed, even those without employees. The COUNT function gives the number of employees per department."
+        },
+        {
+            "question": "List all projects and their department names (if any)",
+            "solution": """
+                SELECT p.name AS project_name, d.name AS department_name
+                FROM projects p
+                LEFT JOIN departments d ON p.department_id = d.id
+            """,
+            "explanation": "This LEFT JOIN shows all projects, including those not assigned to any department (which will have NULL for department_name)."
+        }
+    ],
+    "right_join": [
+        {
+            "question": "List all departments and employees assigned to them (if any)",
+            "solution": """
+                SELECT d.name AS department_name, e.name AS employee_name
+                FROM employees e
+                RIGHT JOIN departments d ON e.department_id = d.id
+            """,
+            "explanation": "This RIGHT JOIN ensures all departments are listed, even those without employees. Note: SQLite doesn't support RIGHT JOIN, so this is simulated with a LEFT JOIN by switching the table order."
+        },
+        {
+            "question": "Show all department locations and the projects running there (if any)",
+            "solution": """
+                SELECT d.location, p.name AS project_name
+                FROM projects p
+                RIGHT JOIN departments d ON p.department_id = d.id
+            """,
+            "explanation": "This RIGHT JOIN lists all department locations, including those without any projects. (Simulated in SQLite)"
+        },
+        {
+            "question": "List all departments and the number of projects in each",
+            "solution": """
+                SELECT d.name AS department_name, COUNT(p.id) AS project_count
+                FROM projects p
+                RIGHT JOIN departments d ON p.department_id = d.id
+                GROUP BY d.id, d.name
+            """,
+            "explanation": "This RIGHT JOIN counts projects for each department, including departments with zero projects. (Simulated in SQLite)"
+        }
+    ],
+    "full_outer_join": [
+        {
+            "question": "List all employees and departments, showing all possible combinations",
+            "solution": """
+                SELECT e.name AS employee_name, d.name AS department_name
+                FROM employees e
+                LEFT JOIN departments d ON e.department_id = d.id
+                UNION ALL
+                SELECT e.name AS employee_name, d.name AS department_name
+                FROM departments d
+                LEFT JOIN employees e ON d.id = e.department_id
+                WHERE e.id IS NULL
+            """,
+            "explanation": "This simulates a FULL OUTER JOIN in SQLite by combining a LEFT JOIN with a UNION ALL to include unmatched rows from both tables."
+        },
+        {
+            "question": "Show all projects and departments, including unmatched records",
+            "solution": """
+                SELECT p.name AS project_name, d.name AS department_name
+                FROM projects p
+                LEFT JOIN departments d ON p.department_id = d.id
+                UNION ALL
+                SELECT p.name AS project_name, d.name AS department_name
+                FROM departments d
+                LEFT JOIN projects p ON d.id = p.department_id
+                WHERE p.id IS NULL
+            """,
+            "explanation": "This query simulates a FULL OUTER JOIN between projects and departments, showing all projects and all departments, even if there's no match."
+        },
+        {
+            "question": "List all employees, departments, and projects, showing all possible combinations",
+            "solution": """
+                SELECT e.name AS employee_name, d.name AS department_name, p.name AS project_name
+                FROM employees e
+                LEFT JOIN departments d ON e.department_id = d.id
+                LEFT JOIN projects p ON d.id = p.department_id
+                UNION ALL
+                SELECT e.name AS employee_name, d.name AS department_name, p.name AS project_name
+                FROM departments d
+                LEFT JOIN employees e ON d.id = e.department_id
+                LEFT JOIN projects p ON d.id = p.department_id
+                WHERE e.id IS NULL
+                UNION ALL
+                SELECT e.name AS employee_name, d.name AS department_name, p.name AS project_name
+                FROM projects p
+                LEFT JOIN departments d ON p.department_id = d.id
+                LEFT JOIN employees e ON d.id = e.department_id
+                WHERE d.id IS NULL
+            """,
+            "explanation": "This complex query simulates a FULL OUTER JOIN across three tables, showing all possible combinations of employees, departments, and projects."
+        }
+    ],
+    "cross_join": [
+        {
+            "question": "Generate all possible employee-department combinations",
+            "solution": """
+                SELECT e.name AS employee_name, d.name AS department_name
+                FROM employees e
+                CROSS JOIN departments d
+            """,
+            "explanation": "This CROSS JOIN creates a Cartesian product of all employees with all departments, useful for generating all possible combinations."
+        },
+        {
+            "question": "List all possible project-location combinations",
+            "solution": """
+                SELECT p.name AS project_name, d.location
+                FROM projects p
+                CROSS JOIN departments d
+            """,
+            "explanation": "This CROSS JOIN shows every project combined with every department location, which could be useful for planning or hypothetical scenarios."
+        },
+        {
+            "question": "Generate a matrix of all employees and all projects",
+            "solution": """
+                SELECT e.name AS employee_name, p.name AS project_name
+                FROM employees e
+                CROSS JOIN projects p
+            """,
+            "explanation": "This CROSS JOIN creates a matrix of all employees with all projects, which could be used for assignment possibilities or workload distribution scenarios."
+        }
+    ]
+}
+
+JOIN_LAB_SIZES = [100, 1000, 10000, 100000]
+
+# Indexes the lab adds on the join keys for the "indexed" runs
+JOIN_KEY_INDEXES = [
+    "CREATE INDEX idx_employees_department ON employees (department_id)",
+    "CREATE INDEX idx_projects_department ON projects (department_id)",
+]
+
+_FROM_CLAUSE = re.compile(r"\bFROM\s+(.*?)(?=\bWHERE\b|\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bHAVING\b|$)",
+                          re.IGNORECASE | re.DOTALL)
+_WHERE_CLAUSE = re.compile(r"\s*WHERE\s+(.*?)(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bHAVING\b|$)",
+                           re.IGNORECASE | re.DOTALL)
+_JOIN_SEPARATOR = re.compile(r"\s*(?:,|\b(?:INNER\s+|CROSS\s+)?JOIN\b)\s*", re.IGNORECASE)
+
+def generate_join_data(conn, employees, departments, projects, skew, seed=0):
+    # Same schema as the practice tables; department_id follows a Zipf
+    # distribution over `departments` keys (skew 0 = uniform) and about 5% of
+    # employees have no department
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) ** skew for i in range(departments)]
+
+    for table in ("employees", "departments", "projects"):
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.execute("CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT, department_id INTEGER)")
+    conn.execute("CREATE TABLE departments (id INTEGER PRIMARY KEY, name TEXT, location TEXT)")
+    conn.execute("CREATE TABLE projects (id INTEGER PRIMARY KEY, name TEXT, department_id INTEGER)")
+
+    conn.executemany("INSERT INTO departments VALUES (?, ?, ?)",
+        ((i, f"Department {i}", f"City {i % 20}") for i in range(1, departments + 1)))
+    keys = rng.choices(range(1, departments + 1), weights=weights, k=employees)
+    conn.executemany("INSERT INTO employees VALUES (?, ?, ?)",
+        ((i + 1, f"Employee {i + 1}", None if rng.random() < 0.05 else key)
+         for i, key in enumerate(keys)))
+    keys = rng.choices(range(1, departments + 1), weights=weights, k=projects)
+    conn.executemany("INSERT INTO projects VALUES (?, ?, ?)",
+        ((i + 1, f"Project {i + 1}", key) for i, key in enumerate(keys)))
+    conn.commit()
+
+def forced_orders(sql):
+    # Rewrite an inner-join query so SQLite must use each possible table
+    # order: CROSS JOIN keeps the written order, and the ON conditions move
+    # to WHERE. Returns {} for queries this can't handle (outer joins,
+    # subqueries in FROM, more than four tables).
+    sql = sql.strip().rstrip(";")
+    match = _FROM_CLAUSE.search(sql)
+    if match is None or sql[:match.start()].count("(") != sql[:match.start()].count(")"):
+        return {}
+    if re.search(r"\b(LEFT|RIGHT|FULL|OUTER|NATURAL|USING)\b|\(", match.group(1), re.IGNORECASE):
+        return {}
+
+    tables, conditions = [], []
+    for item in _JOIN_SEPARATOR.split(match.group(1).strip()):
+        parts = re.split(r"\bON\b", item, maxsplit=1, flags=re.IGNORECASE)
+        tables.append(parts[0].strip())
+        if len(parts) > 1:
+            conditions.append(parts[1].strip())
+    if not 2 <= len(tables) <= 4:
+        return {}
+
+    rest = sql[match.end():]
+    where = _WHERE_CLAUSE.match(rest)
+    if where:
+        conditions.append(where.group(1).strip())
+        rest = rest[where.end():]
+    where_sql = f" WHERE {' AND '.join(f'({c})' for c in conditions)}" if conditions else ""
+
+    orders = {}
+    for order in itertools.permutations(tables):
+        label = " → ".join(table.split()[-1] for table in order)
+        orders[label] = f"{sql[:match.start()]}FROM {' CROSS JOIN '.join(order)}{where_sql} {rest}".strip()
+    return orders
+
+def run_join_lab(sql, employees, departments, projects, skew, seed=0):
+    # One row per (indexes, join order): VM steps, time and plan of `sql` as
+    # written (planner's choice) and with every forced order
+    conn = sqlite3.connect(':memory:')
+    generate_join_data(conn, employees, departments, projects, skew, seed)
+    images = {"none": conn.serialize()}
+    for statement in JOIN_KEY_INDEXES:
+        conn.execute(statement)
+    conn.execute("ANALYZE")
+    conn.commit()
+    images["department_id"] = conn.serialize()
+    conn.close()
+
+    variants = {"planner's choice": sql, **forced_orders(sql)}
+    results = []
+    for indexes, image in images.items():
+        for order, variant_sql in variants.items():
+            try:
+                stats = measure_work(image, variant_sql)
+                error = None
+            except sqlite3.Error as e:
+                stats, error = {"steps": None, "seconds": None, "plan": []}, str(e)
+            results.append({
+                "indexes": indexes,
+                "order": order,
+                "steps": stats["steps"],
+                "ms": None if stats["seconds"] is None else stats["seconds"] * 1000,
+                "plan": " / ".join(stats["plan"]),
+                "error": error,
+            })
+    return pd.DataFrame(results)
+
+def join_cost_lab(category, selection):
+    st.subheader("Join Cost Lab")
+    st.write("Runs the join on generated tables with and without indexes on "
+             "department_id, letting the planner choose the join order and "
+             "forcing every order with CROSS JOIN.")
+    sql = selection["sql"] if selection["sql"].strip() else selection["question"]["solution"]
+
+    col1, col2, col3 = st.columns(3)
+    employees = col1.select_slider("Employees:", JOIN_LAB_SIZES, value=10000)
+    departments = col2.select_slider("Departments (distinct keys):", JOIN_LAB_SIZES, value=100)
+    projects = col3.select_slider("Projects:", JOIN_LAB_SIZES, value=1000)
+    skew = st.slider("Key skew (Zipf exponent, 0 = uniform):", 0.0, 2.0, 0.0, 0.1)
+
+    if st.button("Run cost lab"):
+        with st.spinner("Running join variants..."):
+            st.session_state["join_cost_lab"] = run_join_lab(sql, employees, departments, projects, skew)
+
+    results = st.session_state.get("join_cost_lab")
+    if results is None or results.empty:
+        return
+
+    errors = results[results["error"].notna()]
+    if not errors.empty:
+        st.warning(f"{len(errors)} variant(s) failed to run (gave up after {MAX_STEPS:,} VM steps or errored).")
+    if len(results["order"].unique()) == 1:
+        st.info("Forced join orders need an inner-join query with 2-4 tables in FROM.")
+
+    st.write("**VM steps by join order**")
+    st.bar_chart(results.pivot(index="order", columns="indexes", values="steps"))
+    st.dataframe(results)
+
+def joins_fixture(cursor):
     # Drop existing tables
     cursor.execute("DROP TABLE IF EXISTS employees")
     cursor.execute("DROP TABLE IF EXISTS departments")
@@ -40,254 +353,23 @@ def joins_questions(conn, cursor):
                        [(1, 'IT', 'New York'), (2, 'HR', 'London'), (3, 'Finance', 'Tokyo'), (4, 'Marketing', 'Paris')])
     cursor.executemany("INSERT INTO projects (id, name, department_id) VALUES (?, ?, ?)",
                        [(1, 'Website Redesign', 1), (2, 'Employee Training', 2), (3, 'Budget Analysis', 3), (4, 'New Product Launch', 4)])
-    conn.commit()
-
-    # Display tables at the top
-    st.subheader("Available Tables:")
-    
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.write("**Employees Table**")
-        cursor.execute("SELECT * FROM employees")
-        data = cursor.fetchall()
-        df = pd.DataFrame(data, columns=['id', 'name', 'department_id'])
-        st.dataframe(df)
-    
-    with col2:
-        st.write("**Departments Table**")
-        cursor.execute("SELECT * FROM departments")
-        data = cursor.fetchall()
-        df = pd.DataFrame(data, columns=['id', 'name', 'location'])
-        st.dataframe(df)
-    
-    with col3:
-        st.write("**Projects Table**")
-        cursor.execute("SELECT * FROM projects")
-        data = cursor.fetchall()
-        df = pd.DataFrame(data, columns=['id', 'name', 'department_id'])
-        st.dataframe(df)
-    
-    st.divider()
-
-    questions = {
-        "inner_join": [
-            {
-                "question": "List all employees with their department names",
-                "solution": """
-                    SELECT e.name AS employee_name, d.name AS department_name
-                    FROM employees e
-                    INNER JOIN departments d ON e.department_id = d.id
-                """,
-                "explanation": "This query uses an INNER JOIN to match employees with their departments, showing only employees who have a department assigned."
-            },
-            {
-                "question": "Show all projects with their associated department names",
-                "solution": """
-                    SELECT p.name AS project_name, d.name AS department_name
-                    FROM projects p
-                    INNER JOIN departments d ON p.department_id = d.id
-                """,
-                "explanation": "This INNER JOIN connects projects to their respective departments, displaying only projects that have a department assigned."
-            },
-            {
-                "question": "List employees, their departments, and assigned projects",
-                "solution": """
-                    SELECT e.name AS employee_name, d.name AS department_name, p.name AS project_name
-                    FROM employees e
-                    INNER JOIN departments d ON e.department_id = d.id
-                    INNER JOIN projects p ON d.id = p.department_id
-                """,
-                "explanation": "This query uses two INNER JOINs to connect employees with their departments and the projects assigned to those departments."
-            }
-        ],
-        "left_join": [
-            {
-                "question": "List all employees and their department names (if any)",
-                "solution": """
-                    SELECT e.name AS employee_name, d.name AS department_name
-                    FROM employees e
-                    LEFT JOIN departments d ON e.department_id = d.id
-                """,
-                "explanation": "This LEFT JOIN returns all employees, including those without a department (which will show as NULL for department_name)."
-            },
-            {
-                "question": "Show all departments and the number of employees in each",
-                "solution": """
-                    SELECT d.name AS department_name, COUNT(e.id) AS employee_count
-                    FROM departments d
-                    LEFT JOIN employees e ON d.id = e.department_id
-                    GROUP BY d.id, d.name
-                """,
-                "explanation": "This LEFT JOIN ensures all departments are listed, even those without employees. The COUNT function gives the number of employees per department."
-            },
-            {
-                "question": "List all projects and their department names (if any)",
-                "solution": """
-                    SELECT p.name AS project_name, d.name AS department_name
-                    FROM projects p
-                    LEFT JOIN departments d ON p.department_id = d.id
-                """,
-                "explanation": "This LEFT JOIN shows all projects, including those not assigned to any department (which will have NULL for department_name)."
-            }
-        ],
-        "right_join": [
-            {
-                "question": "List all departments and employees assigned to them (if any)",
-                "solution": """
-                    SELECT d.name AS department_name, e.name AS employee_name
-                    FROM employees e
-                    RIGHT JOIN departments d ON e.department_id = d.id
-                """,
-                "explanation": "This RIGHT JOIN ensures all departments are listed, even those without employees. Note: SQLite doesn't support RIGHT JOIN, so this is simulated with a LEFT JOIN by switching the table order."
-            },
-            {
-                "question": "Show all department locations and the projects running there (if any)",
-                "solution": """
-                    SELECT d.location, p.name AS project_name
-                    FROM projects p
-                    RIGHT JOIN departments d ON p.department_id = d.id
-                """,
-                "explanation": "This RIGHT JOIN lists all department locations, including those without any projects. (Simulated in SQLite)"
-            },
-            {
-                "question": "List all departments and the number of projects in each",
-                "solution": """
-                    SELECT d.name AS department_name, COUNT(p.id) AS project_count
-                    FROM projects p
-                    RIGHT JOIN departments d ON p.department_id = d.id
-                    GROUP BY d.id, d.name
-                """,
-                "explanation": "This RIGHT JOIN counts projects for each department, including departments with zero projects. (Simulated in SQLite)"
-            }
-        ],
-        "full_outer_join": [
-            {
-                "question": "List all employees and departments, showing all possible combinations",
-                "solution": """
-                    SELECT e.name AS employee_name, d.name AS department_name
-                    FROM employees e
-                    LEFT JOIN departments d ON e.department_id = d.id
-                    UNION ALL
-                    SELECT e.name AS employee_name, d.name AS department_name
-                    FROM departments d
-                    LEFT JOIN employees e ON d.id = e.department_id
-                    WHERE e.id IS NULL
-                """,
-                "explanation": "This simulates a FULL OUTER JOIN in SQLite by combining a LEFT JOIN with a UNION ALL to include unmatched rows from both tables."
-            },
-            {
-                "question": "Show all projects and departments, including unmatched records",
-                "solution": """
-                    SELECT p.name AS project_name, d.name AS department_name
-                    FROM projects p
-                    LEFT JOIN departments d ON p.department_id = d.id
-                    UNION ALL
-                    SELECT p.name AS project_name, d.name AS department_name
-                    FROM departments d
-                    LEFT JOIN projects p ON d.id = p.department_id
-                    WHERE p.id IS NULL
-                """,
-                "explanation": "This query simulates a FULL OUTER JOIN between projects and departments, showing all projects and all departments, even if there's no match."
-            },
-            {
-                "question": "List all employees, departments, and projects, showing all possible combinations",
-                "solution": """
-                    SELECT e.name AS employee_name, d.name AS department_name, p.name AS project_name
-                    FROM employees e
-                    LEFT JOIN departments d ON e.department_id = d.id
-                    LEFT JOIN projects p ON d.id = p.department_id
-                    UNION ALL
-                    SELECT e.name AS employee_name, d.name AS department_name, p.name AS project_name
-                    FROM departments d
-                    LEFT JOIN employees e ON d.id = e.department_id
-                    LEFT JOIN projects p ON d.id = p.department_id
-                    WHERE e.id IS NULL
-                    UNION ALL
-                    SELECT e.name AS employee_name, d.name AS department_name, p.name AS project_name
-                    FROM projects p
-                    LEFT JOIN departments d ON p.department_id = d.id
-                    LEFT JOIN employees e ON d.id = e.department_id
-                    WHERE d.id IS NULL
-                """,
-                "explanation": "This complex query simulates a FULL OUTER JOIN across three tables, showing all possible combinations of employees, departments, and projects."
-            }
-        ],
-        "cross_join": [
-            {
-                "question": "Generate all possible employee-department combinations",
-                "solution": """
-                    SELECT e.name AS employee_name, d.name AS department_name
-                    FROM employees e
-                    CROSS JOIN departments d
-                """,
-                "explanation": "This CROSS JOIN creates a Cartesian product of all employees with all departments, useful for generating all possible combinations."
-            },
-            {
-                "question": "List all possible project-location combinations",
-                "solution": """
-                    SELECT p.name AS project_name, d.location
-                    FROM projects p
-                    CROSS JOIN departments d
-                """,
-                "explanation": "This CROSS JOIN shows every project combined with every department location, which could be useful for planning or hypothetical scenarios."
-            },
-            {
-                "question": "Generate a matrix of all employees and all projects",
-                "solution": """
-                    SELECT e.name AS employee_name, p.name AS project_name
-                    FROM employees e
-                    CROSS JOIN projects p
-                """,
-                "explanation": "This CROSS JOIN creates a matrix of all employees with all projects, which could be used for assignment possibilities or workload distribution scenarios."
-            }
-        ]
-    }
-
-    join_type = st.selectbox("Select JOIN type:", list(questions.keys()), format_func=lambda x: x.replace('_', ' ').title())
-    question_index = st.selectbox("Select question:", range(1, 4), format_func=lambda x: f"Question {x}")
-    
-    selected_question = questions[join_type][question_index - 1]
 
-    st.subheader("Question:")
-    st.write(selected_question["question"])
-    
-    user_query = st.text_area("Enter your SQL query:")
-    
-    if st.button("Submit"):
-        try:
-            cursor.execute(user_query)
-            result = cursor.fetchall()
-            
-            if result:
-                st.success("Query executed successfully!")
-                st.write("Result:")
-                df = pd.DataFrame(result)
-                st.dataframe(df)
-            else:
-                st.warning("Query executed but returned no results.")
-                
-        except Exception as e:
-            st.error(f"Error executing query: {str(e)}")
-    
-    if st.button("Show Solution", key="show_solution"):
-        st.code(selected_question["solution"], language="sql")
-        st.write("Explanation:")
-        st.write(selected_question["explanation"])
+JOINS_CATEGORY = Category("JOINS", "SQL JOIN Practice", joins_fixture, JOIN_QUESTIONS,
+                          previews=["employees", "departments", "projects"],
+                          type_label="Select JOIN type:",
+                          tools={"Efficiency score": efficiency_panel, "Cost lab": join_cost_lab})
 
 def main():
     st.title("SQL JOIN Practice App")
 
-    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn = session_sandbox()
     cursor = conn.cursor()
 
     try:
-        joins_questions(conn, cursor)
+        JOINS_CATEGORY.render(conn, cursor)
     except sqlite3.Error as e:
         st.error(f"An error occurred: {e}")
         print(f"SQLite error: {e}")
 
-    conn.close()
-
 if __name__ == "__main__":
     main()
@@ -0,0 +1,90 @@
+import sqlite3
+import sys
+
+# Hard caps for every sandbox connection, so one learner's runaway query
+# (say an INSERT ... SELECT over a cross join) fails on its own instead of
+# taking the whole process down
+SANDBOX_MAX_BYTES = 64 * 2**20
+MAX_VALUE_BYTES = 8 * 2**20
+MAX_SQL_LENGTH = 100 * 2**10
+MAX_COLUMNS = 500
+MAX_RESULT_ROWS = 10000
+
+# Every learner script is interrupted after this long (checked by a progress
+# handler every PROGRESS_STEPS VM steps), and never fetches more rows than
+# MAX_FETCH_ROWS, even where the caller wants the whole result
+QUERY_TIMEOUT_SECONDS = 10
+PROGRESS_STEPS = 10000
+MAX_FETCH_ROWS = 100000
+
+# Process-wide SQLite heap limits shared by all sandboxes: above the soft
+# limit SQLite starts releasing cache, at the hard limit allocations fail
+SOFT_HEAP_LIMIT = 256 * 2**20
+HARD_HEAP_LIMIT = 1024 * 2**20
+
+class SandboxLimitError(sqlite3.OperationalError):
+    pass
+
+def apply_limits(conn):
+    # max_page_count belongs to the current database image, so this has to
+    # run again after every deserialize()
+    conn.setlimit(sqlite3.SQLITE_LIMIT_LENGTH, MAX_VALUE_BYTES)
+    conn.setlimit(sqlite3.SQLITE_LIMIT_SQL_LENGTH, MAX_SQL_LENGTH)
+    conn.setlimit(sqlite3.SQLITE_LIMIT_COLUMN, MAX_COLUMNS)
+    conn.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 0)
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    conn.execute(f"PRAGMA max_page_count = {SANDBOX_MAX_BYTES // page_size}").fetchall()
+    if conn.execute("PRAGMA soft_heap_limit").fetchone()[0] != SOFT_HEAP_LIMIT:
+        conn.execute(f"PRAGMA soft_heap_limit = {SOFT_HEAP_LIMIT}").fetchall()
+        conn.execute(f"PRAGMA hard_heap_limit = {HARD_HEAP_LIMIT}").fetchall()
+
+def time_limit_error():
+    return SandboxLimitError(
+        "Sandbox time limit reached: the query ran too long and was stopped "
+        f"(the limit is {QUERY_TIMEOUT_SECONDS} seconds per submit).")
+
+def limit_error(e):
+    # A SandboxLimitError explaining which cap `e` ran into, or None
+    name = getattr(e, "sqlite_errorname", "")
+    message = str(e)
+    if name == "SQLITE_FULL" or "database or disk is full" in message:
+        return SandboxLimitError(
+            f"Sandbox storage limit reached: the database cannot grow beyond "
+            f"{SANDBOX_MAX_BYTES / 2**20:.0f} MB. The statement was rolled back; "
+            f"delete some rows or reset the sandbox.")
+    if name == "SQLITE_TOOBIG" or "too big" in message or "too long" in message:
+        return SandboxLimitError(
+            f"Sandbox size limit reached ({message}): values are limited to "
+            f"{MAX_VALUE_BYTES / 2**20:.0f} MB and SQL text to {MAX_SQL_LENGTH // 2**10} KB.")
+    if name == "SQLITE_INTERRUPT" or message == "interrupted":
+        return time_limit_error()
+    if name == "SQLITE_NOMEM" or "out of memory" in message:
+        return SandboxLimitError(
+            f"Sandbox memory limit reached: the query needed more memory than the "
+            f"{HARD_HEAP_LIMIT / 2**20:.0f} MB shared by all sessions allows.")
+    return None
+
+def result_bytes(rows):
+    # Approximate in-memory size of a fetched result set
+    return sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in rows)
+
+def sandbox_usage(conn, result=None):
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+    cache_pages = cache_size if cache_size >= 0 else -cache_size * 1024 // page_size
+    usage = {
+        "page_count": page_count,
+        "max_page_count": conn.execute("PRAGMA max_page_count").fetchone()[0],
+        "database_bytes": page_count * page_size,
+        "max_bytes": SANDBOX_MAX_BYTES,
+        # sqlite3 does not expose sqlite3_db_status(), so this is the upper
+        # bound: pages that fit in the cache out of the pages in the database
+        "cache_pages": min(page_count, cache_pages),
+        "cache_capacity_pages": cache_pages,
+    }
+    if result is not None:
+        usage["result_rows"] = len(result["rows"])
+        usage["result_bytes"] = result_bytes(result["rows"])
+        usage["truncated"] = result["truncated"]
+    return usage
@@ -0,0 +1,290 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from streamlit.testing.v1 import AppTest
+from executor import execute_sql, fresh_sandbox
+from perf import current_rss, percentiles
+from question_bank import CATEGORIES, category_key, grade_answer, question_id
+
+# Simulated learners moving through categories, picking questions and
+# submitting a mix of correct, incorrect and pathological SQL, against the
+# execution engine, the Streamlit app (via AppTest) or a running api.py.
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+PATHOLOGICAL_SQL = [
+    "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 200000) "
+    "SELECT COUNT(*) FROM n",
+    "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 400) "
+    "SELECT COUNT(*) FROM n a, n b",
+    "SELEC * FRM employees",
+    "SELECT * FROM missing_table",
+]
+
+def pick_submission(rng, category, question_type, question, mix):
+    # Returns (kind, sql) where kind is correct / incorrect / pathological
+    kind = rng.choices(["correct", "incorrect", "pathological"], weights=mix)[0]
+    if kind == "correct":
+        return kind, question["solution"]
+    if kind == "incorrect":
+        others = [q for bank in CATEGORIES[category].questions.values() for q in bank
+                  if q is not question]
+        if others:
+            return kind, rng.choice(others)["solution"]
+        return kind, "SELECT 1"
+    return kind, rng.choice(PATHOLOGICAL_SQL)
+
+def learner_plan(rng, steps, mix):
+    # Sequence of (category, question type, index, question, kind, sql);
+    # learners stay on a category for a few submissions before moving on
+    plan = []
+    while len(plan) < steps:
+        category = rng.choice(list(CATEGORIES))
+        for _ in range(rng.randint(1, 3)):
+            question_type = rng.choice(list(CATEGORIES[category].questions))
+            bank = CATEGORIES[category].questions[question_type]
+            index = rng.randint(1, len(bank))
+            question = bank[index - 1]
+            kind, sql = pick_submission(rng, category, question_type, question, mix)
+            plan.append((category, question_type, index, question, kind, sql))
+    return plan[:steps]
+
+class EngineLearner:
+    def __init__(self, options):
+        self.conn = None
+        self.category = None
+
+    def open_category(self, category):
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = fresh_sandbox(CATEGORIES[category].fixture)
+        self.category = category
+
+    def select_question(self, question_type, index):
+        pass
+
+    def submit(self, question, sql):
+        try:
+            execute_sql(self.conn, sql, max_rows=1000)
+        except (sqlite3.Error, ValueError):
+            return "error"
+        return "correct" if grade_answer(self.category, question, sql)["correct"] else "incorrect"
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+class AppTestLearner:
+    def __init__(self, options):
+        self.at = AppTest.from_file(APP_PATH, default_timeout=options.timeout)
+        self.at.run()
+
+    def open_category(self, category):
+        self.at.sidebar.selectbox[0].select(category).run()
+
+    def select_question(self, question_type, index):
+        self.at.selectbox[0].select(question_type).run()
+        self.at.selectbox[1].select(index).run()
+
+    def submit(self, question, sql):
+        self.at.text_area[0].input(sql)
+        next(b for b in self.at.button if b.label == "Submit").click().run()
+        if self.at.exception:
+            return "exception"
+        return "error" if self.at.error else "executed"
+
+    def close(self):
+        pass
+
+class ApiLearner:
+    def __init__(self, options):
+        self.url = options.url.rstrip("/")
+        self.session = None
+        self.category = None
+
+    def _call(self, method, path, body=None):
+        request = urllib.request.Request(self.url + path, method=method,
+                                         data=json.dumps(body).encode() if body is not None else None,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as e:
+            return e.code, json.load(e)
+
+    def open_category(self, category):
+        if self.session is not None:
+            self._call("DELETE", f"/sessions/{self.session}")
+        status, payload = self._call("POST", "/sessions", {"category": category_key(category)})
+        self.session = payload.get("session")
+        self.category = category
+
+    def select_question(self, question_type, index):
+        self.question_id = question_id(self.category, question_type, index)
+        self._call("GET", f"/questions/{self.question_id}")
+
+    def submit(self, question, sql):
+        status, _ = self._call("POST", f"/sessions/{self.session}/execute", {"sql": sql})
+        if status != 200:
+            return "error" if status == 400 else f"http_{status}"
+        status, payload = self._call("POST", "/grade", {"question": self.question_id, "sql": sql})
+        if status != 200:
+            return f"http_{status}"
+        return "correct" if payload["correct"] else "incorrect"
+
+    def close(self):
+        if self.session is not None:
+            self._call("DELETE", f"/sessions/{self.session}")
+
+TARGETS = {"engine": EngineLearner, "apptest": AppTestLearner, "api": ApiLearner}
+
+def _timed(records, action, fn, *args):
+    start = time.perf_counter()
+    try:
+        outcome = fn(*args)
+    except Exception as e:
+        outcome = f"exception: {type(e).__name__}"
+    records.append((action, time.perf_counter() - start, outcome))
+    return outcome
+
+def learner_steps(options, seed, records):
+    # Generator that performs one learner action per step
+    rng = random.Random(seed)
+    learner = TARGETS[options.target](options)
+    current = None
+    for category, question_type, index, question, kind, sql in learner_plan(rng, options.steps, options.mix):
+        if category != current:
+            _timed(records, "open_category", learner.open_category, category)
+            current = category
+            yield
+        _timed(records, "select_question", learner.select_question, question_type, index)
+        yield
+        _timed(records, f"submit_{kind}", learner.submit, question, sql)
+        if options.think > 0:
+            time.sleep(rng.uniform(0, 2 * options.think))
+        yield
+    learner.close()
+
+def run_learner(options, seed, records):
+    for _ in learner_steps(options, seed, records):
+        pass
+
+def run_interleaved(options, seeds, records):
+    # AppTest drives a process-wide Streamlit runtime and is not thread-safe,
+    # so its sessions share one thread and take turns, like sessions sharing
+    # one Streamlit server process
+    learners = [learner_steps(options, seed, records) for seed in seeds]
+    while learners:
+        for learner in list(learners):
+            try:
+                next(learner)
+            except StopIteration:
+                learners.remove(learner)
+
+def run_process(options, seeds):
+    # One worker process: a thread per learner, with RSS sampled throughout
+    records = []
+    peak = [current_rss()]
+    done = threading.Event()
+
+    def sample_rss():
+        while not done.wait(0.2):
+            peak[0] = max(peak[0], current_rss())
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    if options.target == "apptest":
+        run_interleaved(options, seeds, records)
+    else:
+        threads = [threading.Thread(target=run_learner, args=(options, seed, records))
+                   for seed in seeds]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    done.set()
+    return {"pid": os.getpid(), "records": records,
+            "peak_rss": max(peak[0], current_rss()), "final_rss": current_rss()}
+
+def summarize(options, results, elapsed, server_rss):
+    records = [record for result in results for record in result["records"]]
+    print(f"target={options.target} learners={options.learners} processes={options.processes} "
+          f"steps={options.steps} elapsed={elapsed:.2f}s")
+    print(f"actions={len(records)} throughput={len(records) / elapsed:.1f} actions/s")
+    print()
+    print(f"{'action':<24}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  outcomes")
+    summary = {}
+    for action in sorted({record[0] for record in records}):
+        latencies = [r[1] for r in records if r[0] == action]
+        outcomes = {}
+        for r in records:
+            if r[0] == action and r[2] is not None:
+                outcomes[r[2]] = outcomes.get(r[2], 0) + 1
+        cuts = percentiles(latencies)
+        print(f"{action:<24}{len(latencies):>8}{cuts[50] * 1000:>10.1f}{cuts[95] * 1000:>10.1f}"
+              f"{cuts[99] * 1000:>10.1f}  {outcomes}")
+        summary[action] = {"count": len(latencies), "outcomes": outcomes,
+                           **{f"p{p}_ms": v * 1000 for p, v in cuts.items()}}
+    print()
+    for result in results:
+        print(f"pid {result['pid']}: peak RSS {result['peak_rss'] / 2**20:.1f} MB, "
+              f"final RSS {result['final_rss'] / 2**20:.1f} MB")
+    if server_rss:
+        print(f"server pid {options.server_pid}: peak RSS {server_rss / 2**20:.1f} MB")
+    return {"elapsed": elapsed, "actions": len(records), "throughput": len(records) / elapsed,
+            "latency": summary,
+            "rss": {r["pid"]: {"peak": r["peak_rss"], "final": r["final_rss"]} for r in results},
+            "server_peak_rss": server_rss}
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent learners")
+    parser.add_argument("--target", choices=list(TARGETS), default="engine")
+    parser.add_argument("--learners", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--steps", type=int, default=10, help="submissions per learner")
+    parser.add_argument("--think", type=float, default=0.0, help="mean think time in seconds")
+    parser.add_argument("--mix", type=lambda s: [float(x) for x in s.split(",")], default=[0.6, 0.3, 0.1],
+                        help="correct,incorrect,pathological weights")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="api.py base URL")
+    parser.add_argument("--server-pid", type=int, help="sample RSS of this process (e.g. api.py)")
+    parser.add_argument("--timeout", type=float, default=60, help="AppTest script timeout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the summary to this file")
+    options = parser.parse_args()
+
+    seeds = [options.seed + i for i in range(options.learners)]
+    chunks = [seeds[i::options.processes] for i in range(options.processes)]
+
+    server_peak = [0]
+    done = threading.Event()
+
+    def sample_server():
+        while not done.wait(0.2):
+            server_peak[0] = max(server_peak[0], current_rss(options.server_pid))
+
+    if options.server_pid:
+        threading.Thread(target=sample_server, daemon=True).start()
+
+    start = time.perf_counter()
+    if options.processes == 1:
+        results = [run_process(options, chunks[0])]
+    else:
+        with multiprocessing.Pool(options.processes) as pool:
+            results = pool.starmap(run_process, [(options, chunk) for chunk in chunks])
+    elapsed = time.perf_counter() - start
+    done.set()
+
+    summary = summarize(options, results, elapsed, server_peak[0])
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
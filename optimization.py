@@ -0,0 +1,200 @@
+import streamlit as st
+import sqlite3
+from category import Category
+from sandbox import session_sandbox
+
+# Each question gives a slow query to rewrite. An answer passes when it returns
+# the same rows as the solution using at most `budget` times the solution's
+# VM steps on the (large) optimization fixture.
+OPTIMIZATION_QUESTIONS = {
+    "correlated_subquery": [
+        {
+            "question": "Rewrite this query listing employees who earn more than their department's average salary",
+            "slow_query": """
+                SELECT e.id, e.name, e.salary
+                FROM employees e
+                WHERE e.salary > (SELECT AVG(salary) FROM employees e2
+                                  WHERE e2.department_id = e.department_id);
+            """,
+            "solution": """
+                WITH dept_avg AS (
+                    SELECT department_id, AVG(salary) AS avg_salary
+                    FROM employees
+                    GROUP BY department_id
+                )
+                SELECT e.id, e.name, e.salary
+                FROM employees e
+                JOIN dept_avg d ON d.department_id = e.department_id
+                WHERE e.salary > d.avg_salary;
+            """,
+            "explanation": "The correlated subquery recomputes the department average once per employee. Computing every average once with GROUP BY and joining to it reads each employee a constant number of times.",
+            "budget": 2
+        },
+        {
+            "question": "Rewrite this query listing the top earner(s) of each department",
+            "slow_query": """
+                SELECT e.department_id, e.name, e.salary
+                FROM employees e
+                WHERE e.salary = (SELECT MAX(salary) FROM employees e2
+                                  WHERE e2.department_id = e.department_id);
+            """,
+            "solution": """
+                WITH dept_max AS (
+                    SELECT department_id, MAX(salary) AS max_salary
+                    FROM employees
+                    GROUP BY department_id
+                )
+                SELECT e.department_id, e.name, e.salary
+                FROM employees e
+                JOIN dept_max d ON d.department_id = e.department_id
+                WHERE e.salary = d.max_salary;
+            """,
+            "explanation": "Same pattern: the maximum per department is computed once instead of scanning the department again for every employee.",
+            "budget": 2
+        }
+    ],
+    "non_sargable_predicate": [
+        {
+            "question": "Rewrite this query listing employees hired in 2023 so it can use the index on hire_date",
+            "slow_query": """
+                SELECT id, name, hire_date
+                FROM employees
+                WHERE strftime('%Y', hire_date) = '2023';
+            """,
+            "solution": """
+                SELECT id, name, hire_date
+                FROM employees
+                WHERE hire_date >= '2023-01-01' AND hire_date < '2024-01-01';
+            """,
+            "explanation": "Wrapping the column in a function hides it from the index, so every row is read. A range on the bare column becomes an index SEARCH.",
+            "budget": 2
+        },
+        {
+            "question": "Rewrite this query listing employees hired in March 2022 so it can use the index on hire_date",
+            "slow_query": """
+                SELECT id, name, hire_date
+                FROM employees
+                WHERE substr(hire_date, 1, 7) = '2022-03';
+            """,
+            "solution": """
+                SELECT id, name, hire_date
+                FROM employees
+                WHERE hire_date >= '2022-03-01' AND hire_date < '2022-04-01';
+            """,
+            "explanation": "substr() on the column forces a full scan; ISO dates sort as text, so a half-open range on hire_date selects the same rows through the index.",
+            "budget": 2
+        }
+    ],
+    "anti_join": [
+        {
+            "question": "Rewrite this query listing employees with no sales",
+            "slow_query": """
+                SELECT e.id, e.name
+                FROM employees e
+                LEFT JOIN sales s ON s.employee_id = e.id
+                WHERE s.id IS NULL;
+            """,
+            "solution": """
+                SELECT e.id, e.name
+                FROM employees e
+                WHERE NOT EXISTS (SELECT 1 FROM sales s WHERE s.employee_id = e.id);
+            """,
+            "explanation": "The LEFT JOIN visits every sale of every employee only to throw the matches away. NOT EXISTS stops at the first matching sale.",
+            "budget": 2
+        },
+        {
+            "question": "Rewrite this query listing departments with no employees",
+            "slow_query": """
+                SELECT d.id, d.name
+                FROM departments d
+                LEFT JOIN employees e ON e.department_id = d.id
+                WHERE e.id IS NULL;
+            """,
+            "solution": """
+                SELECT d.id, d.name
+                FROM departments d
+                WHERE NOT EXISTS (SELECT 1 FROM employees e WHERE e.department_id = d.id);
+            """,
+            "explanation": "Each department has hundreds of employees; the anti-join only needs to know whether there is at least one.",
+            "budget": 2
+        }
+    ]
+}
+
+def optimization_fixture(cursor):
+    # Drop existing tables
+    cursor.execute("DROP TABLE IF EXISTS sales")
+    cursor.execute("DROP TABLE IF EXISTS employees")
+    cursor.execute("DROP TABLE IF EXISTS departments")
+
+    # Create tables
+    cursor.execute("""
+        CREATE TABLE departments (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            location TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE employees (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            department_id INTEGER,
+            salary REAL,
+            hire_date DATE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE sales (
+            id INTEGER PRIMARY KEY,
+            employee_id INTEGER,
+            amount REAL,
+            sale_date DATE
+        )
+    """)
+
+    # Generate deterministic data: 50 departments (41-50 empty), 10,000
+    # employees and 100,000 sales (employees above 9,000 have none)
+    cursor.execute("""
+        INSERT INTO departments
+        WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 50)
+        SELECT x, 'Department ' || x, 'City ' || (x % 7) FROM n
+    """)
+    cursor.execute("""
+        INSERT INTO employees
+        WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 10000)
+        SELECT x, 'Employee ' || x, (x * 7) % 40 + 1, 30000 + (x * 7919) % 90000,
+               date('2015-01-01', '+' || ((x * 37) % 3650) || ' days')
+        FROM n
+    """)
+    cursor.execute("""
+        INSERT INTO sales
+        WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 100000)
+        SELECT x, (x * 104729) % 9000 + 1, (x * 31) % 5000 + 10,
+               date('2020-01-01', '+' || ((x * 13) % 1500) || ' days')
+        FROM n
+    """)
+
+    cursor.execute("CREATE INDEX idx_employees_department ON employees (department_id)")
+    cursor.execute("CREATE INDEX idx_employees_hire_date ON employees (hire_date)")
+    cursor.execute("CREATE INDEX idx_sales_employee ON sales (employee_id)")
+    cursor.execute("ANALYZE")
+
+OPTIMIZATION_CATEGORY = Category("QUERY OPTIMIZATION", "SQL Query Optimization Practice",
+                                 optimization_fixture, OPTIMIZATION_QUESTIONS,
+                                 previews=["employees", "departments", "sales"], preview_rows=5,
+                                 type_label="Select Optimization Type:")
+
+def main():
+    st.title("SQL Query Optimization Practice App")
+    conn = session_sandbox()
+    cursor = conn.cursor()
+
+    try:
+        OPTIMIZATION_CATEGORY.render(conn, cursor)
+    except sqlite3.Error as e:
+        st.error(f"An error occurred: {e}")
+        print(f"SQLite error: {e}")
+
+if __name__ == "__main__":
+    main()
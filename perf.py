@@ -0,0 +1,99 @@
+import os
+import statistics
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# SQLite's own heap counters (sqlite3_status64), where the sqlite3 module
+# exposes the C API; run_timed falls back to sampling RSS without them
+try:
+    import _sqlite3
+    import ctypes
+    _sqlite_status = ctypes.CDLL(_sqlite3.__file__).sqlite3_status64
+except (ImportError, OSError, AttributeError):
+    _sqlite_status = None
+
+SQLITE_STATUS_MEMORY_USED = 0
+
+# Both memory figures are process-wide, not per connection, so runs are
+# measured one at a time. Queries from other sessions running meanwhile
+# still count towards a run's figure.
+_measure_lock = threading.Lock()
+
+def current_rss(pid="self"):
+    # Resident set size of a process in bytes (0 if it cannot be read)
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None and pid == "self":
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return 0
+
+def percentiles(values, points=(50, 95, 99)):
+    # {50: p50, 95: p95, ...} of a list of numbers (None when empty)
+    values = sorted(values)
+    if len(values) < 2:
+        return {p: values[0] if values else None for p in points}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {p: cuts[p - 1] for p in points}
+
+def sqlite_memory(reset=False):
+    # (bytes in use, high-water mark) of SQLite's heap across the process;
+    # reset starts a new high-water mark at the current usage
+    current, highwater = ctypes.c_int64(), ctypes.c_int64()
+    _sqlite_status(SQLITE_STATUS_MEMORY_USED, ctypes.byref(current), ctypes.byref(highwater), int(reset))
+    return current.value, highwater.value
+
+def run_timed(conn, sql, params=(), sample_every=10000):
+    # Run a query to completion and report wall time, peak memory growth of
+    # the whole process and row count. Memory is SQLite's high-water mark,
+    # restarted for each run, so a run does not reuse what an earlier one
+    # grew; RSS (sampled from inside the SQLite VM via the progress handler)
+    # only as a fallback.
+    with _measure_lock:
+        return _run_timed(conn, sql, params, sample_every)
+
+def _run_timed(conn, sql, params, sample_every):
+    if _sqlite_status is not None:
+        baseline, _ = sqlite_memory(reset=True)
+        start = time.perf_counter()
+        rows = sum(1 for _ in conn.execute(sql, params))
+        elapsed = time.perf_counter() - start
+        return {
+            "seconds": elapsed,
+            "memory_bytes": max(sqlite_memory()[1] - baseline, 0),
+            "rows": rows,
+        }
+
+    baseline = current_rss()
+    peak = [baseline]
+
+    def sample():
+        rss = current_rss()
+        if rss > peak[0]:
+            peak[0] = rss
+        return 0
+
+    conn.set_progress_handler(sample, sample_every)
+    try:
+        start = time.perf_counter()
+        cursor = conn.execute(sql, params)
+        rows = 0
+        for _ in cursor:
+            rows += 1
+        elapsed = time.perf_counter() - start
+    finally:
+        conn.set_progress_handler(None, 0)
+    sample()
+
+    return {
+        "seconds": elapsed,
+        "memory_bytes": peak[0] - baseline,
+        "rows": rows,
+    }
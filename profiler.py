@@ -0,0 +1,190 @@
+import streamlit as st
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# Opt-in sampling profiler for one app.py run or fragment rerun. Enable it with
+# SQL_PRACTICE_PROFILE=1 on the server (never from the URL, so visitors
+# cannot fill the disk); every run then writes a speedscope file
+# (https://www.speedscope.app) to profiles/, which keeps the newest
+# MAX_PROFILE_FILES.
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(REPO_DIR, "app.py")
+PROFILE_DIR = os.path.join(REPO_DIR, "profiles")
+PROFILE_ENV = "SQL_PRACTICE_PROFILE"
+SAMPLE_INTERVAL = 0.001
+MAX_PROFILE_SECONDS = 120
+MAX_PROFILE_FILES = 100
+
+# Modules whose frames only say "the page is running"; samples are attributed
+# to whatever they called into
+_PAGE_MODULES = {"app.py", "ddl_questions.py", "dml_questions.py", "dql_questions.py",
+                 "tcl_questions.py", "joins.py", "windows.py", "cte.py", "triggers.py",
+                 "optimization.py", "category.py"}
+
+def profiling_enabled():
+    return os.environ.get(PROFILE_ENV, "") not in ("", "0")
+
+def phase_of(stack):
+    # Phase of one sample; stack is outermost frame first. The first library
+    # frame below the last repo frame wins (st.dataframe() spends its time in
+    # pyarrow, but it is rendering); library frames above repo code, like the
+    # st.fragment wrapper, only pass control on. Otherwise the innermost repo
+    # module that has a phase.
+    app_frames = [i for i, frame in enumerate(stack) if frame[0] == APP_PATH]
+    stack = stack[app_frames[0] if app_frames else 0:]
+    last_repo = max((i for i, frame in enumerate(stack) if frame[0].startswith(REPO_DIR)), default=-1)
+    phase = "other"
+    for i, (filename, function, _) in enumerate(stack):
+        name = os.path.basename(filename)
+        if not filename.startswith(REPO_DIR):
+            if i < last_repo:
+                continue
+            if f"{os.sep}streamlit{os.sep}" in filename:
+                return "st.* rendering"
+            if f"{os.sep}pandas{os.sep}" in filename or f"{os.sep}pyarrow{os.sep}" in filename:
+                return "DataFrame construction"
+            continue
+        if name == "profiler.py":
+            continue
+        if name == "fixtures.py" or function.endswith("_fixture"):
+            phase = "fixture setup"
+        elif name == "executor.py":
+            phase = "query execution"
+        elif name in _PAGE_MODULES:
+            if phase == "other":
+                phase = "table previews and page SQL"
+        else:
+            phase = f"{name[:-3]} module"
+    return phase
+
+class SamplingProfiler:
+    # Samples the Python stack of one thread (the Streamlit script thread)
+    # from a background thread using sys._current_frames()
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = []
+        self.started = None
+        self.elapsed = 0.0
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._done.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._done.wait(self.interval):
+            now = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or now - self.started > MAX_PROFILE_SECONDS:
+                break
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+                frame = frame.f_back
+            self.samples.append((tuple(reversed(stack)), now - last))
+            last = now
+
+    def phases(self):
+        totals = {}
+        for stack, weight in self.samples:
+            phase = phase_of(stack)
+            totals[phase] = totals.get(phase, 0.0) + weight
+        return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+    def speedscope(self, name):
+        frames = []
+        index = {}
+        samples = []
+        for stack, _ in self.samples:
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[1], "file": frame[0], "line": frame[2]})
+                sample.append(index[frame])
+            samples.append(sample)
+        weights = [weight for _, weight in self.samples]
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "sql-practice profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled", "name": name, "unit": "seconds",
+                "startValue": 0, "endValue": sum(weights),
+                "samples": samples, "weights": weights,
+            }],
+        }
+
+    def write(self, name):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}.speedscope.json")
+        with open(path, "w") as f:
+            json.dump(self.speedscope(name), f)
+        # Oldest first: the names start with the time they were written
+        files = sorted(f for f in os.listdir(PROFILE_DIR) if f.endswith(".speedscope.json"))
+        for old in files[:-MAX_PROFILE_FILES]:
+            try:
+                os.remove(os.path.join(PROFILE_DIR, old))
+            except OSError:
+                pass
+        return path
+
+def start_profiling():
+    # Called at the top of app.py; returns None unless profiling is enabled.
+    # A run cut short by a rerun never reaches finish_profiling(), so any
+    # profiler left over from it is stopped here.
+    previous = st.session_state.pop("_profiler", None)
+    if previous is not None:
+        previous.stop()
+    if not profiling_enabled():
+        return None
+    profiler = SamplingProfiler(threading.get_ident()).start()
+    st.session_state["_profiler"] = profiler
+    return profiler
+
+def finish_profiling(profiler, name, container=None):
+    # Called at the bottom of app.py: write the profile and show where the
+    # run spent its time in the sidebar (or `container`)
+    if profiler is None:
+        return
+    st.session_state.pop("_profiler", None)
+    profiler.stop()
+    name = "".join(c if c.isalnum() else "_" for c in name).lower()
+    path = profiler.write(name)
+    with (container or st.sidebar).expander("Profile", expanded=True):
+        st.caption(f"{profiler.elapsed * 1000:.0f} ms, {len(profiler.samples)} samples")
+        st.dataframe([{"phase": phase, "ms": round(seconds * 1000, 1)}
+                      for phase, seconds in profiler.phases().items()])
+        st.caption(f"Open {os.path.relpath(path, REPO_DIR)} in https://www.speedscope.app")
+
+def profile_fragment(func):
+    # For st.fragment functions: a rerun of only the fragment skips app.py, so
+    # it is profiled here and reported under the fragment (fragments cannot
+    # write to the sidebar). Within a full run the run's profiler is active.
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if "_profiler" in st.session_state or not profiling_enabled():
+            return func(*args, **kwargs)
+        profiler = start_profiling()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            name = "_".join(filter(None, [getattr(args[0], "key", None) if args else None, func.__name__]))
+            finish_profiling(profiler, name, st)
+    return wrapper
@@ -0,0 +1,100 @@
+import streamlit as st
+import sqlite3
+import pandas as pd
+import os
+import time
+import uuid
+
+# Append-only log of every submitted query, shared by all sessions of this
+# server, for the learner's own history and for replay.py
+QUERY_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_log.db")
+HISTORY_ROWS = 20
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS query_log (
+        id INTEGER PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        question_id TEXT NOT NULL,
+        category TEXT NOT NULL,
+        engine TEXT NOT NULL,
+        sql TEXT NOT NULL,
+        submitted_at REAL NOT NULL,
+        seconds REAL,
+        row_count INTEGER,
+        outcome TEXT NOT NULL,
+        error TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_query_log_user ON query_log (user_id, submitted_at);
+    CREATE INDEX IF NOT EXISTS idx_query_log_question ON query_log (question_id, submitted_at);
+    CREATE INDEX IF NOT EXISTS idx_query_log_time ON query_log (submitted_at);
+    CREATE TRIGGER IF NOT EXISTS query_log_no_update BEFORE UPDATE ON query_log
+    BEGIN SELECT RAISE(ABORT, 'query_log is append-only'); END;
+    CREATE TRIGGER IF NOT EXISTS query_log_no_delete BEFORE DELETE ON query_log
+    BEGIN SELECT RAISE(ABORT, 'query_log is append-only'); END;
+"""
+
+# Paths whose schema this process has already created
+_ready = set()
+
+def connect_log(path=QUERY_LOG_PATH):
+    conn = sqlite3.connect(path, timeout=5)
+    if path not in _ready:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(_SCHEMA)
+        _ready.add(path)
+    return conn
+
+def current_user():
+    # A random id for this browser session. Never taken from the URL, where
+    # anyone could pick another learner's id and read their history.
+    return st.session_state.setdefault("user_id", uuid.uuid4().hex[:12])
+
+def log_query(user_id, question_id, category, engine, sql, seconds, row_count, outcome,
+              error=None, path=QUERY_LOG_PATH):
+    # Never lets a logging failure reach the learner
+    try:
+        conn = connect_log(path)
+        try:
+            with conn:
+                conn.execute("""
+                    INSERT INTO query_log (user_id, question_id, category, engine, sql, submitted_at,
+                                           seconds, row_count, outcome, error)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (user_id, question_id, category, engine, sql, time.time(), seconds, row_count,
+                      outcome, error))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass
+
+def user_history(user_id, question_id, limit=HISTORY_ROWS, path=QUERY_LOG_PATH):
+    # Like log_query, an unreadable log shows up as an empty history
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    try:
+        conn = connect_log(path)
+    except sqlite3.Error:
+        return pd.DataFrame()
+    try:
+        return pd.read_sql_query("""
+            SELECT datetime(submitted_at, 'unixepoch', 'localtime') AS submitted, outcome, engine,
+                   round(seconds * 1000, 2) AS ms, row_count AS rows, sql, error
+            FROM query_log
+            WHERE user_id = ? AND question_id = ?
+            ORDER BY submitted_at DESC
+            LIMIT ?
+        """, conn, params=(user_id, question_id, limit))
+    except (sqlite3.Error, pd.errors.DatabaseError):
+        return pd.DataFrame()
+    finally:
+        conn.close()
+
+def query_history(category, selection):
+    st.subheader("Query History")
+    history = user_history(current_user(), selection["question_id"])
+    if history.empty:
+        st.caption("No submissions for this question in this browser session yet.")
+        return
+    st.caption(f"Your last {len(history)} submissions for this question in this browser session "
+               f"(history starts over after a reload or in a new tab)")
+    st.dataframe(history, hide_index=True)
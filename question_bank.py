@@ -0,0 +1,39 @@
+from ddl_questions import DDL_CATEGORY
+from dml_questions import DML_CATEGORY
+from dql_questions import DQL_CATEGORY
+from tcl_questions import TCL_CATEGORY
+from joins import JOINS_CATEGORY
+from windows import WINDOW_CATEGORY
+from cte import CTE_CATEGORY
+from triggers import TRIGGER_CATEGORY
+from optimization import OPTIMIZATION_CATEGORY
+from category import category_key, question_id
+
+# Every practice category, in sidebar order. Each Category declares its
+# fixture, question bank and grading mode (see category.py).
+CATEGORIES = {category.name: category for category in [
+    DDL_CATEGORY, DML_CATEGORY, DQL_CATEGORY, TCL_CATEGORY, JOINS_CATEGORY,
+    WINDOW_CATEGORY, CTE_CATEGORY, TRIGGER_CATEGORY, OPTIMIZATION_CATEGORY,
+]}
+
+def iter_questions():
+    # (question id, category, question type, 1-based index, question dict)
+    for category, spec in CATEGORIES.items():
+        for question_type, bank in spec.questions.items():
+            for index, question in enumerate(bank, start=1):
+                yield question_id(category, question_type, index), category, question_type, index, question
+
+def find_question(qid):
+    for found_id, category, question_type, index, question in iter_questions():
+        if found_id == qid:
+            return category, question
+    raise KeyError(qid)
+
+def find_category(name):
+    for category in CATEGORIES:
+        if name in (category, category_key(category)):
+            return category
+    raise KeyError(name)
+
+def grade_answer(category, question, sql, efficiency=False):
+    return CATEGORIES[category].grade(question, sql, efficiency)
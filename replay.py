@@ -0,0 +1,153 @@
+import argparse
+import json
+import sqlite3
+import statistics
+import time
+from efficiency import scaled_image
+from engines import ENGINES
+from executor import execute_sql
+from limits import apply_limits
+from query_log import QUERY_LOG_PATH, connect_log
+from question_bank import CATEGORIES
+from sandbox import PERFORMANCE_PROFILES, apply_profile
+
+# Re-runs logged learner queries against scaled fixtures, other engines or
+# performance profiles and compares their times with the logged ones, to catch
+# performance regressions in the queries the cohort actually writes. Queries
+# run on the category fixture, not the session state they were submitted in.
+
+REPLAY_TIMEOUT_SECONDS = 10
+REGRESSION_RATIO = 2.0
+
+# Times below this are too noisy to call a regression
+MIN_REGRESSION_SECONDS = 0.001
+
+def load_queries(path=QUERY_LOG_PATH, user=None, question=None, since=None, limit=None,
+                 outcomes=("correct", "incorrect")):
+    # Distinct (category, question, engine, sql) with their median logged time
+    conn = connect_log(path)
+    try:
+        clauses = [f"outcome IN ({', '.join('?' for _ in outcomes)})", "seconds IS NOT NULL"]
+        params = list(outcomes)
+        if user:
+            clauses.append("user_id = ?")
+            params.append(user)
+        if question:
+            clauses.append("question_id = ?")
+            params.append(question)
+        if since:
+            clauses.append("submitted_at >= ?")
+            params.append(since)
+        rows = conn.execute(f"""
+            SELECT category, question_id, engine, sql, seconds FROM query_log
+            WHERE {' AND '.join(clauses)}
+            ORDER BY submitted_at DESC
+        """, params).fetchall()
+    finally:
+        conn.close()
+    queries = {}
+    for category, question_id, engine, sql, seconds in rows:
+        queries.setdefault((category, question_id, engine, sql), []).append(seconds)
+    replayable = [{"category": category, "question_id": question_id, "engine": engine, "sql": sql,
+                   "logged_seconds": statistics.median(times), "submissions": len(times)}
+                  for (category, question_id, engine, sql), times in queries.items()
+                  if category in CATEGORIES]
+    return replayable[:limit] if limit else replayable
+
+def run_sqlite(image, sql, profile, timeout=REPLAY_TIMEOUT_SECONDS):
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.deserialize(image)
+        # After deserialize(), which resets the profile's PRAGMAs
+        apply_profile(conn, profile)
+        apply_limits(conn)
+        return execute_sql(conn, sql, timeout=timeout)["seconds"]
+    finally:
+        conn.close()
+
+def replay_query(query, factor, engine, profile):
+    image = scaled_image(CATEGORIES[query["category"]].fixture, factor)
+    start = time.perf_counter()
+    try:
+        if engine == "SQLite":
+            seconds = run_sqlite(image, query["sql"], profile)
+        else:
+            seconds = ENGINES[engine].execute(image, (query["category"], factor), query["sql"])["seconds"]
+        error = None
+    except (sqlite3.Error, ValueError) as e:
+        seconds = time.perf_counter() - start
+        error = "timed out" if "time limit" in str(e) else str(e)
+    return {"seconds": seconds, "error": error}
+
+def replay(queries, factors, engines, profile):
+    results = []
+    for query in queries:
+        for engine in engines:
+            baseline = None
+            for factor in factors:
+                run = replay_query(query, factor, engine, profile)
+                if baseline is None and run["error"] is None:
+                    baseline = run["seconds"]
+                result = {
+                    "question_id": query["question_id"],
+                    "sql": " ".join(query["sql"].split()),
+                    "logged_engine": query["engine"],
+                    "logged_ms": query["logged_seconds"] * 1000,
+                    "engine": engine,
+                    "factor": factor,
+                    "ms": run["seconds"] * 1000,
+                    "growth": run["seconds"] / baseline if baseline else None,
+                    "error": run["error"],
+                }
+                # Same setting as when it was logged, but much slower now
+                result["regression"] = (
+                    factor == 1 and engine == query["engine"] and run["error"] is None
+                    and run["seconds"] > MIN_REGRESSION_SECONDS
+                    and run["seconds"] > REGRESSION_RATIO * query["logged_seconds"])
+                results.append(result)
+    return results
+
+def summarize(results):
+    print(f"{'question':<36}{'engine':<8}{'factor':>8}{'logged ms':>11}{'ms':>11}{'growth':>9}  sql")
+    for r in results:
+        growth = f"{r['growth']:.1f}x" if r["growth"] else "-"
+        flag = " REGRESSION" if r["regression"] else ""
+        status = f" [{r['error']}]" if r["error"] else flag
+        print(f"{r['question_id']:<36}{r['engine']:<8}{r['factor']:>8}{r['logged_ms']:>11.2f}"
+              f"{r['ms']:>11.2f}{growth:>9}  {r['sql'][:60]}{status}")
+    regressions = sum(1 for r in results if r["regression"])
+    print()
+    print(f"{len(results)} runs, {regressions} regressions "
+          f"(>{REGRESSION_RATIO:g}x the logged time at factor 1 on the logged engine)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay logged learner queries")
+    parser.add_argument("--db", default=QUERY_LOG_PATH, help="query log database")
+    parser.add_argument("--user", help="only this user's queries")
+    parser.add_argument("--question", help="only this question id, e.g. dql/basic_select/1")
+    parser.add_argument("--since", type=float, help="only queries submitted after this unix time")
+    parser.add_argument("--limit", type=int, help="replay at most this many distinct queries")
+    parser.add_argument("--factors", type=lambda s: [int(x) for x in s.split(",")], default=[1, 10, 100],
+                        help="comma-separated fixture scale factors")
+    parser.add_argument("--engines", type=lambda s: s.split(","), default=["SQLite"],
+                        help=f"comma-separated engines ({', '.join(ENGINES)})")
+    parser.add_argument("--profile", choices=list(PERFORMANCE_PROFILES), default="Default",
+                        help="performance profile for SQLite runs")
+    parser.add_argument("--json", help="write the results to this file")
+    options = parser.parse_args()
+
+    engines = [engine for engine in options.engines if engine in ENGINES and ENGINES[engine].available]
+    for engine in set(options.engines) - set(engines):
+        print(f"Skipping unavailable engine {engine}")
+    queries = load_queries(options.db, options.user, options.question, options.since, options.limit)
+    print(f"Replaying {len(queries)} distinct queries at factors {options.factors} on {engines}")
+    results = replay(queries, options.factors, engines, options.profile)
+    regressions = summarize(results)
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
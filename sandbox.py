@@ -0,0 +1,146 @@
+import streamlit as st
+import sqlite3
+import pandas as pd
+import os
+import tempfile
+import time
+from limits import MAX_RESULT_ROWS, apply_limits, sandbox_usage
+
+# PRAGMA presets applied when a sandbox connection is created. Values left out
+# keep SQLite's defaults; journal_mode and mmap_size only matter for
+# file-backed sandboxes.
+PERFORMANCE_PROFILES = {
+    "Default": {},
+    "Durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "temp_store": "DEFAULT",
+        "mmap_size": 0,
+    },
+    "Balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "temp_store": "MEMORY",
+        "mmap_size": 64 * 2**20,
+    },
+    "Fast (unsafe)": {
+        "journal_mode": "MEMORY",
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "temp_store": "MEMORY",
+        "mmap_size": 256 * 2**20,
+    },
+}
+
+PROFILE_PRAGMAS = ["journal_mode", "synchronous", "cache_size", "temp_store", "mmap_size"]
+
+class SandboxConnection(sqlite3.Connection):
+    # Remembers the profile it was opened with, so it can be applied again
+    # after deserialize() resets the PRAGMAs, and its data version (see
+    # fixtures.data_version); both go away with the connection
+    profile = "Default"
+    version = None
+
+def apply_profile(conn, profile):
+    for pragma, value in PERFORMANCE_PROFILES[profile].items():
+        conn.execute(f"PRAGMA {pragma} = {value}").fetchall()
+
+def current_pragmas(conn):
+    # Some PRAGMAs return no row where they do not apply (mmap_size on an
+    # in-memory database); those show as None
+    settings = {}
+    for pragma in PROFILE_PRAGMAS:
+        row = conn.execute(f"PRAGMA {pragma}").fetchone()
+        settings[pragma] = row[0] if row else None
+    return settings
+
+def create_sandbox(path=':memory:', profile="Default"):
+    conn = sqlite3.connect(path, check_same_thread=False, factory=SandboxConnection)
+    conn.profile = profile
+    apply_profile(conn, profile)
+    apply_limits(conn)
+    return conn
+
+def session_sandbox(profile="Default"):
+    # One sandbox per browser session, kept open across reruns so fragments
+    # rerunning on their own still have it; a new profile opens a new one
+    sandbox = st.session_state.get("sandbox")
+    if sandbox is None or sandbox["profile"] != profile:
+        if sandbox is not None:
+            sandbox["conn"].close()
+        sandbox = {"profile": profile, "conn": create_sandbox(profile=profile)}
+        st.session_state["sandbox"] = sandbox
+    return sandbox["conn"]
+
+def measure_profile(profile, fixture, workload, repetitions=20, on_disk=True, setup=None):
+    # Rebuild the fixture and run the workload `repetitions` times on a fresh
+    # sandbox opened with the given profile. The question's setup script runs
+    # before each workload run, outside the timings.
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = create_sandbox(os.path.join(tmp, "sandbox.db") if on_disk else ':memory:', profile)
+        cursor = conn.cursor()
+        fixture_time = workload_time = 0.0
+        error = None
+        try:
+            for _ in range(repetitions):
+                start = time.perf_counter()
+                fixture(cursor)
+                conn.commit()
+                fixture_time += time.perf_counter() - start
+                if setup:
+                    conn.executescript(setup)
+
+                start = time.perf_counter()
+                conn.executescript(workload)
+                workload_time += time.perf_counter() - start
+        except sqlite3.Error as e:
+            error = str(e)
+        finally:
+            settings = current_pragmas(conn)
+            conn.close()
+
+    return {
+        "profile": profile,
+        "fixture_ms": fixture_time / repetitions * 1000,
+        "workload_ms": workload_time / repetitions * 1000,
+        "total_ms": (fixture_time + workload_time) / repetitions * 1000,
+        "error": error,
+        **settings,
+    }
+
+def profile_comparison(fixture, workload, key, setup=None):
+    # Side-by-side measurement of every profile on the current question.
+    # Results are kept per question for the session so runs can be compared.
+    st.subheader("Performance Profiles")
+    repetitions = st.slider("Repetitions:", 1, 200, 20, key=f"{key}_repetitions")
+    on_disk = st.checkbox("File-backed sandbox", value=True, key=f"{key}_on_disk")
+
+    measurements = st.session_state.setdefault("profile_measurements", {})
+    if st.button("Measure profiles", key=f"{key}_measure"):
+        with st.spinner("Measuring..."):
+            measurements[key] = pd.DataFrame([
+                measure_profile(profile, fixture, workload, repetitions, on_disk, setup)
+                for profile in PERFORMANCE_PROFILES
+            ])
+
+    results = measurements.get(key)
+    if results is not None:
+        errors = results["error"].dropna()
+        if not errors.empty:
+            st.warning(f"Workload failed: {errors.iloc[0]}")
+        st.bar_chart(results.set_index("profile")[["fixture_ms", "workload_ms"]])
+        st.dataframe(results)
+
+def show_usage(conn, result=None):
+    # Readout of the sandbox against its limits, under a successful Submit
+    usage = sandbox_usage(conn, result)
+    st.progress(min(usage["database_bytes"] / usage["max_bytes"], 1.0),
+                text=f"Sandbox: {usage['page_count']} of {usage['max_page_count']} pages "
+                     f"({usage['database_bytes'] / 2**20:.1f} of {usage['max_bytes'] / 2**20:.0f} MB) · "
+                     f"cache up to {usage['cache_pages']} of {usage['cache_capacity_pages']} pages")
+    if result is not None and result["columns"] is not None:
+        st.caption(f"Result set: {usage['result_rows']} rows, ~{usage['result_bytes'] / 2**10:.0f} KB")
+        if usage["truncated"]:
+            st.warning(f"Only the first {MAX_RESULT_ROWS} rows were fetched.")
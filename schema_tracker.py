@@ -0,0 +1,108 @@
+import streamlit as st
+
+def snapshot_schema(cursor, previous=None):
+    # Capture tables, columns and indexes. Objects whose CREATE statement is
+    # unchanged since `previous` are reused instead of re-running the PRAGMAs.
+    cursor.execute("PRAGMA schema_version")
+    version = cursor.fetchone()[0]
+    if previous is not None and previous["version"] == version:
+        return previous
+
+    old_objects = previous["objects"] if previous is not None else {}
+    cursor.execute("""
+        SELECT type, name, tbl_name, sql FROM sqlite_master
+        WHERE type IN ('table', 'index') AND name NOT LIKE 'sqlite_%'
+    """)
+    objects = {}
+    for obj_type, name, table, sql in cursor.fetchall():
+        key = (obj_type, name)
+        old = old_objects.get(key)
+        if old is not None and old["sql"] == sql:
+            objects[key] = old
+        elif obj_type == "table":
+            objects[key] = {"sql": sql, "table": table,
+                            "columns": _table_columns(cursor, name),
+                            "constraint_indexes": _constraint_indexes(cursor, name)}
+        else:
+            objects[key] = {"sql": sql, "table": table,
+                            "columns": _index_columns(cursor, name),
+                            "unique": _index_is_unique(cursor, table, name)}
+
+    return {"version": version, "objects": objects}
+
+def diff_schema(before, after):
+    # List of (action, object type, name, details) for everything that changed
+    changes = []
+    old, new = before["objects"], after["objects"]
+    if before["version"] == after["version"]:
+        return changes
+
+    for key in sorted(new.keys() - old.keys()):
+        changes.append(("added", key[0], key[1], new[key]))
+    for key in sorted(old.keys() - new.keys()):
+        changes.append(("dropped", key[0], key[1], old[key]))
+    for key in sorted(old.keys() & new.keys()):
+        if old[key] is new[key] or old[key] == new[key]:
+            continue
+        if key[0] == "table":
+            old_columns = {c["name"]: c for c in old[key]["columns"]}
+            new_columns = {c["name"]: c for c in new[key]["columns"]}
+            details = dict(new[key])
+            details["added_columns"] = [c for n, c in new_columns.items() if n not in old_columns]
+            details["dropped_columns"] = [c for n, c in old_columns.items() if n not in new_columns]
+            details["changed_columns"] = [c for n, c in new_columns.items()
+                                          if n in old_columns and old_columns[n] != c]
+            changes.append(("altered", key[0], key[1], details))
+        else:
+            changes.append(("altered", key[0], key[1], new[key]))
+    return changes
+
+def show_schema_diff(changes):
+    if not changes:
+        st.info("No schema changes.")
+        return
+
+    st.write("Schema Changes:")
+    for action, obj_type, name, details in changes:
+        if obj_type == "table":
+            st.write(f"**{action.title()} table `{name}`**")
+            if action == "altered":
+                for column in details["added_columns"]:
+                    st.write(f"+ column `{column['name']}` {column['type']}")
+                for column in details["dropped_columns"]:
+                    st.write(f"- column `{column['name']}`")
+                for column in details["changed_columns"]:
+                    st.write(f"~ column `{column['name']}` {column['type']}")
+            if action == "added":
+                for index in details["constraint_indexes"]:
+                    kind = "unique index" if index["unique"] else "index"
+                    st.write(f"+ {kind} `{index['name']}` ({', '.join(index['columns'])})")
+            if action != "dropped":
+                st.code(details["sql"], language="sql")
+        else:
+            kind = "unique index" if details.get("unique") else "index"
+            columns = ", ".join(details["columns"])
+            st.write(f"**{action.title()} {kind} `{name}`** on `{details['table']}` ({columns})")
+
+def _table_columns(cursor, table):
+    cursor.execute(f'PRAGMA table_info("{table}")')
+    return [{"name": name, "type": col_type, "notnull": bool(notnull),
+             "default": default, "pk": pk}
+            for _, name, col_type, notnull, default, pk in cursor.fetchall()]
+
+def _index_columns(cursor, index):
+    cursor.execute(f'PRAGMA index_info("{index}")')
+    return [name for _, _, name in cursor.fetchall()]
+
+def _index_is_unique(cursor, table, index):
+    cursor.execute(f'PRAGMA index_list("{table}")')
+    return any(name == index and unique for _, name, unique, _, _ in cursor.fetchall())
+
+def _constraint_indexes(cursor, table):
+    # Indexes SQLite creates for UNIQUE / PRIMARY KEY constraints; they have
+    # no entry with sql in sqlite_master so they are tracked with their table
+    cursor.execute(f'PRAGMA index_list("{table}")')
+    indexes = [(name, bool(unique)) for _, name, unique, origin, _ in cursor.fetchall()
+               if origin != "c"]
+    return [{"name": name, "unique": unique, "columns": _index_columns(cursor, name)}
+            for name, unique in indexes]
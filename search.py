@@ -0,0 +1,121 @@
+import streamlit as st
+import sqlite3
+import hashlib
+import json
+import os
+import re
+from question_bank import category_key, iter_questions
+
+# Full-text index (FTS5) over every question, solution and explanation. It is
+# built once into search.db and only rebuilt when the question banks change.
+SEARCH_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "search.db")
+MAX_RESULTS = 20
+
+# bm25() weights for the question, solution and explanation columns
+COLUMN_WEIGHTS = (10.0, 1.0, 4.0)
+
+# snippet() only ever quotes the question column (the fifth), so results never
+# show any part of a solution or explanation
+SNIPPET_COLUMN = 4
+
+# Whether this process has already checked the index against the banks
+_index_checked = set()
+
+def bank_version():
+    digest = hashlib.sha256()
+    for qid, category, question_type, index, question in iter_questions():
+        digest.update(json.dumps([qid, question.get("question"), question.get("solution"),
+                                  question.get("explanation")]).encode())
+    return digest.hexdigest()
+
+def build_search_index(path=SEARCH_DB_PATH):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("DROP TABLE IF EXISTS question_search")
+        conn.execute("""
+            CREATE VIRTUAL TABLE question_search USING fts5(
+                id UNINDEXED, category UNINDEXED, question_type UNINDEXED, question_index UNINDEXED,
+                question, solution, explanation,
+                tokenize = 'porter unicode61'
+            )
+        """)
+        conn.executemany(
+            "INSERT INTO question_search VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((qid, category, question_type, index, question["question"], question["solution"],
+              question.get("explanation", ""))
+             for qid, category, question_type, index, question in iter_questions()))
+        conn.execute("CREATE TABLE IF NOT EXISTS search_meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("INSERT OR REPLACE INTO search_meta VALUES ('bank_version', ?)", (bank_version(),))
+        conn.execute("INSERT INTO question_search (question_search) VALUES ('optimize')")
+        conn.commit()
+    finally:
+        conn.close()
+
+def ensure_search_index(path=SEARCH_DB_PATH):
+    # Build the index if it is missing or stale; checked once per process
+    if path in _index_checked:
+        return
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            stored = conn.execute("SELECT value FROM search_meta WHERE key = 'bank_version'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        stored = None
+    if stored is None or stored[0] != bank_version():
+        build_search_index(path)
+    _index_checked.add(path)
+
+def match_expression(text):
+    # Every word must match, the last one as a prefix so results narrow while
+    # typing; words are quoted so FTS5 operators in the input are literal
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " AND ".join(terms)
+
+def search_questions(text, limit=MAX_RESULTS, path=SEARCH_DB_PATH):
+    expression = match_expression(text)
+    if expression is None:
+        return []
+    ensure_search_index(path)
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute(f"""
+            SELECT id, category, question_type, question_index, question,
+                   snippet(question_search, {SNIPPET_COLUMN}, '**', '**', '…', 12)
+            FROM question_search
+            WHERE question_search MATCH ?
+            ORDER BY bm25(question_search, 0, 0, 0, 0, {', '.join(map(str, COLUMN_WEIGHTS))})
+            LIMIT ?
+        """, (expression, limit)).fetchall()
+    finally:
+        conn.close()
+    return [{"id": qid, "category": category, "type": question_type, "index": int(index),
+             "question": question, "snippet": " ".join(snippet.split())}
+            for qid, category, question_type, index, question, snippet in rows]
+
+def _open_question(category, question_type, index):
+    # Runs before the next rerun renders any widget, so the selectboxes pick it up
+    key = category_key(category)
+    st.session_state["category"] = category
+    st.session_state[f"{key}_type"] = question_type
+    st.session_state[f"{key}_question"] = index
+
+def search_sidebar():
+    text = st.sidebar.text_input("Search questions", placeholder="e.g. salary rank")
+    if not text.strip():
+        return
+    results = search_questions(text)
+    if not results:
+        st.sidebar.caption("No matching questions.")
+        return
+    for result in results:
+        label = f"{result['category']} · {result['type'].replace('_', ' ')} {result['index']}"
+        st.sidebar.button(f"{label}: {result['question']}", key=f"search_{result['id']}",
+                          on_click=_open_question,
+                          args=(result["category"], result["type"], result["index"]))
+        st.sidebar.caption(result["snippet"])
@@ -1,10 +1,62 @@
 import streamlit as st
 import sqlite3
-import pandas as pd
+from concurrency_lab import BEGIN_MODES, compare_begin_modes
+from category import Category
+from sandbox import session_sandbox
 
-def tcl_questions(conn, cursor):
-    st.header("SQL TCL Practice")
-    
+TCL_QUESTIONS = {
+    "begin_transaction": [
+        {
+            "question": "Start a new transaction",
+            "solution": """
+                BEGIN TRANSACTION;
+            """,
+            "explanation": "Starts a new transaction block."
+        }
+    ],
+    "commit": [
+        {
+            "question": "Transfer money between accounts and commit the transaction",
+            "solution": """
+                BEGIN TRANSACTION;
+                UPDATE accounts SET balance = balance - 500 WHERE id = 1;
+                UPDATE accounts SET balance = balance + 500 WHERE id = 2;
+                INSERT INTO transactions (account_id, type, amount) 
+                VALUES (1, 'TRANSFER_OUT', 500), (2, 'TRANSFER_IN', 500);
+                COMMIT;
+            """,
+            "explanation": "Commits a transaction after successful money transfer between accounts."
+        }
+    ],
+    "rollback": [
+        {
+            "question": "Rollback a failed transaction",
+            "solution": """
+                BEGIN TRANSACTION;
+                UPDATE accounts SET balance = balance - 5000 WHERE id = 1;
+                -- The balance went negative, so undo the whole transaction
+                ROLLBACK;
+            """,
+            "explanation": "Rolls back a transaction when the account balance would go negative. SQLite has no IF outside triggers (RAISE() only works in a trigger), so the check is made by the application, which then issues ROLLBACK."
+        }
+    ],
+    "savepoint": [
+        {
+            "question": "Use savepoint in a transaction",
+            "solution": """
+                BEGIN TRANSACTION;
+                SAVEPOINT before_transfer;
+                UPDATE accounts SET balance = balance - 100 WHERE id = 1;
+                -- If something goes wrong
+                ROLLBACK TO SAVEPOINT before_transfer;
+                COMMIT;
+            """,
+            "explanation": "Creates a savepoint to roll back to if needed within a transaction."
+        }
+    ]
+}
+
+def tcl_fixture(cursor):
     # Drop existing tables
     cursor.execute("DROP TABLE IF EXISTS accounts")
     cursor.execute("DROP TABLE IF EXISTS transactions")
@@ -33,143 +85,47 @@ def tcl_questions(conn, cursor):
         [(1, 'John', 1000.00),
          (2, 'Alice', 2000.00),
          (3, 'Bob', 1500.00)])
-    
-    conn.commit()
 
-    # Display tables
-    st.subheader("Available Tables:")
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.write("**Accounts Table**")
-        cursor.execute("SELECT * FROM accounts")
-        df = pd.DataFrame(cursor.fetchall(), columns=['id', 'name', 'balance'])
-        st.dataframe(df)
-    
-    with col2:
-        st.write("**Transactions Table**")
-        cursor.execute("SELECT * FROM transactions")
-        df = pd.DataFrame(cursor.fetchall(), 
-                         columns=['id', 'account_id', 'type', 'amount', 'transaction_date'])
-        st.dataframe(df)
+def concurrency_lab(category, selection):
+    st.subheader("Concurrency Lab")
+    st.write("Runs the transaction from several threads at once against a shared, "
+             "file-backed sandbox in WAL mode.")
 
-    st.divider()
+    default_script = selection["sql"] or selection["question"]["solution"]
+    script = st.text_area("Transaction script:", value=default_script.strip(), height=200)
+    threads = st.slider("Threads:", 1, 32, 8)
+    transactions = st.slider("Transactions per thread:", 10, 1000, 100, 10)
+    modes = st.multiselect("BEGIN modes:", BEGIN_MODES, default=BEGIN_MODES)
 
-    questions = {
-        "begin_transaction": [
-            {
-                "question": "Start a new transaction",
-                "solution": """
-                    BEGIN TRANSACTION;
-                """,
-                "explanation": "Starts a new transaction block."
-            }
-        ],
-        "commit": [
-            {
-                "question": "Transfer money between accounts and commit the transaction",
-                "solution": """
-                    BEGIN TRANSACTION;
-                    UPDATE accounts SET balance = balance - 500 WHERE id = 1;
-                    UPDATE accounts SET balance = balance + 500 WHERE id = 2;
-                    INSERT INTO transactions (account_id, type, amount) 
-                    VALUES (1, 'TRANSFER_OUT', 500), (2, 'TRANSFER_IN', 500);
-                    COMMIT;
-                """,
-                "explanation": "Commits a transaction after successful money transfer between accounts."
-            }
-        ],
-        "rollback": [
-            {
-                "question": "Rollback a failed transaction",
-                "solution": """
-                    BEGIN TRANSACTION;
-                    UPDATE accounts SET balance = balance - 5000 WHERE id = 1;
-                    -- Check if balance would go negative
-                    SELECT CASE 
-                        WHEN (SELECT balance FROM accounts WHERE id = 1) < 0 
-                        THEN RAISE(ROLLBACK, 'Insufficient funds')
-                    END;
-                    ROLLBACK;
-                """,
-                "explanation": "Rolls back a transaction if the account balance would go negative."
-            }
-        ],
-        "savepoint": [
-            {
-                "question": "Use savepoint in a transaction",
-                "solution": """
-                    BEGIN TRANSACTION;
-                    SAVEPOINT before_transfer;
-                    UPDATE accounts SET balance = balance - 100 WHERE id = 1;
-                    -- If something goes wrong
-                    ROLLBACK TO SAVEPOINT before_transfer;
-                    COMMIT;
-                """,
-                "explanation": "Creates a savepoint to roll back to if needed within a transaction."
-            }
-        ]
-    }
+    if st.button("Run load"):
+        with st.spinner("Running transactions..."):
+            st.session_state["concurrency_results"] = compare_begin_modes(
+                script, modes, threads, transactions, tcl_fixture)
 
-    tcl_type = st.selectbox("Select TCL Operation:", 
-                           list(questions.keys()), 
-                           format_func=lambda x: x.replace('_', ' ').title())
-    
-    question_index = st.selectbox("Select Question:", 
-                                range(1, len(questions[tcl_type]) + 1), 
-                                format_func=lambda x: f"Question {x}")
-    
-    selected_question = questions[tcl_type][question_index - 1]
+    results = st.session_state.get("concurrency_results")
+    if results is not None and not results.empty:
+        st.write("**Commits per second**")
+        st.bar_chart(results.set_index("mode")["commits_per_second"])
+        st.write("**Latency percentiles (ms)**")
+        st.bar_chart(results.set_index("mode")[["p50_ms", "p95_ms", "p99_ms"]], stack=False)
+        st.dataframe(results)
 
-    st.subheader("Question:")
-    st.write(selected_question["question"])
-    
-    user_query = st.text_area("Enter your SQL query:")
-    
-    if st.button("Submit"):
-        try:
-            # Split multiple statements
-            statements = user_query.split(';')
-            for statement in statements:
-                if statement.strip():
-                    cursor.execute(statement)
-            conn.commit()
-            
-            st.success("Transaction executed successfully!")
-            st.write("Updated Tables:")
-            
-            # Show updated data
-            cursor.execute("SELECT * FROM accounts")
-            st.write("Accounts Table:")
-            df = pd.DataFrame(cursor.fetchall(), columns=['id', 'name', 'balance'])
-            st.dataframe(df)
-            
-            cursor.execute("SELECT * FROM transactions")
-            st.write("Transactions Table:")
-            df = pd.DataFrame(cursor.fetchall(), 
-                            columns=['id', 'account_id', 'type', 'amount', 'transaction_date'])
-            st.dataframe(df)
-            
-        except Exception as e:
-            st.error(f"Error executing transaction: {str(e)}")
-            cursor.execute("ROLLBACK")
-    
-    if st.button("Show Solution", key="show_solution"):
-        st.code(selected_question["solution"], language="sql")
-        st.write("Explanation:")
-        st.write(selected_question["explanation"])
+TCL_CATEGORY = Category("TCL", "SQL TCL Practice", tcl_fixture, TCL_QUESTIONS, grading="state",
+                        previews=["accounts", "transactions"], history=True,
+                        type_label="Select TCL Operation:",
+                        success_message="Transaction executed successfully!",
+                        tools={"Concurrency lab": concurrency_lab},
+                        capture_changes=True)
 
 def main():
     st.title("SQL TCL Practice App")
-    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn = session_sandbox()
     cursor = conn.cursor()
 
     try:
-        tcl_questions(conn, cursor)
+        TCL_CATEGORY.render(conn, cursor)
     except sqlite3.Error as e:
         st.error(f"An error occurred: {e}")
 
-    conn.close()
-
 if __name__ == "__main__":
     main()
@@ -0,0 +1,86 @@
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from executor import SOLUTIONS_DB_PATH, result_hash, run_for_grading, solution_key
+from question_bank import CATEGORIES, find_question, iter_questions
+
+# Runs every reference solution on a fresh copy of its fixture, in a process
+# pool, and records the result hash, row count and time of each question in
+# questions.db. Grading compares against these hashes instead of re-running
+# the solutions; a failing solution is reported here and shown as such.
+
+def verify_question(qid):
+    category, question = find_question(qid)
+    spec = CATEGORIES[category]
+    mode = spec.grading_for(question)
+    result = {
+        "question_id": qid,
+        "category": category,
+        "solution_key": solution_key(spec.fixture, question["solution"], mode, spec.probes,
+                                     question.get("setup")),
+        "result_hash": None,
+        "row_count": None,
+        "seconds": None,
+        "error": None,
+    }
+    try:
+        outcome = run_for_grading(spec.fixture, question["solution"], mode, spec.probes, question.get("setup"))
+        result.update(result_hash=result_hash(outcome["rows"]), row_count=outcome["row_count"],
+                      seconds=outcome["seconds"])
+    except (sqlite3.Error, ValueError) as e:
+        result["error"] = str(e)
+    return result
+
+def verify_all(workers=None):
+    qids = [qid for qid, category, question_type, index, question in iter_questions()]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(verify_question, qids))
+
+def store_results(results, path=SOLUTIONS_DB_PATH):
+    # Replaces the previous run, so removed questions disappear too
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS solution_results (
+                question_id TEXT PRIMARY KEY,
+                category TEXT NOT NULL,
+                solution_key TEXT NOT NULL,
+                result_hash TEXT,
+                row_count INTEGER,
+                seconds REAL,
+                error TEXT,
+                verified_at TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_solution_results_key ON solution_results (solution_key)")
+        conn.execute("DELETE FROM solution_results")
+        conn.executemany("""
+            INSERT INTO solution_results
+            VALUES (:question_id, :category, :solution_key, :result_hash, :row_count, :seconds, :error,
+                    datetime('now'))
+        """, results)
+        conn.commit()
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run and record every reference solution")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--db", default=SOLUTIONS_DB_PATH, help="database to record results in")
+    options = parser.parse_args()
+
+    start = time.perf_counter()
+    results = verify_all(options.workers)
+    store_results(results, options.db)
+    failures = [result for result in results if result["error"]]
+    for result in failures:
+        print(f"FAIL {result['question_id']}: {result['error']}")
+    print(f"Verified {len(results)} solutions in {time.perf_counter() - start:.1f}s "
+          f"with {options.workers} workers: {len(failures)} failed")
+    print(f"Recorded results in {options.db}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,10 +1,296 @@
 import streamlit as st
 import sqlite3
 import pandas as pd
+import random
+import re
+from perf import run_timed
+from category import Category
+from sandbox import session_sandbox
 
-def window_questions(conn, cursor):
-    st.header("SQL Window Functions Practice")
-    
+WINDOW_QUESTIONS = {
+    "aggregate_functions": [
+        {
+            "question": "Calculate department-wise average salary using AVG()",
+            "solution": """
+                SELECT department, name, salary,
+                       AVG(salary) OVER (PARTITION BY department) as avg_dept_salary
+                FROM employees;
+            """
+        },
+        {
+            "question": "Find maximum salary in each department using MAX()",
+            "solution": """
+                SELECT department, name, salary,
+                       MAX(salary) OVER (PARTITION BY department) as max_dept_salary
+                FROM employees;
+            """
+        },
+        {
+            "question": "Calculate minimum salary in each department using MIN()",
+            "solution": """
+                SELECT department, name, salary,
+                       MIN(salary) OVER (PARTITION BY department) as min_dept_salary
+                FROM employees;
+            """
+        },
+        {
+            "question": "Calculate running total of sales using SUM()",
+            "solution": """
+                SELECT employee_id, sale_date, amount,
+                       SUM(amount) OVER (PARTITION BY employee_id ORDER BY sale_date) as running_total
+                FROM sales;
+            """
+        },
+        {
+            "question": "Count employees in each department using COUNT()",
+            "solution": """
+                SELECT department, name,
+                       COUNT(*) OVER (PARTITION BY department) as dept_emp_count
+                FROM employees;
+            """
+        }
+    ],
+    "ranking_functions": [
+        {
+            "question": "Assign row numbers to employees by salary using ROW_NUMBER()",
+            "solution": """
+                SELECT name, salary,
+                       ROW_NUMBER() OVER (ORDER BY salary DESC) as salary_rank
+                FROM employees;
+            """
+        },
+        {
+            "question": "Rank employees by salary using RANK()",
+            "solution": """
+                SELECT name, salary,
+                       RANK() OVER (ORDER BY salary DESC) as salary_rank
+                FROM employees;
+            """
+        },
+        {
+            "question": "Rank employees without gaps using DENSE_RANK()",
+            "solution": """
+                SELECT name, salary,
+                       DENSE_RANK() OVER (ORDER BY salary DESC) as dense_salary_rank
+                FROM employees;
+            """
+        },
+        {
+            "question": "Calculate percentage rank using PERCENT_RANK()",
+            "solution": """
+                SELECT name, salary,
+                       PERCENT_RANK() OVER (ORDER BY salary) as salary_percentile
+                FROM employees;
+            """
+        },
+        {
+            "question": "Divide employees into quartiles using NTILE()",
+            "solution": """
+                SELECT name, salary,
+                       NTILE(4) OVER (ORDER BY salary) as salary_quartile
+                FROM employees;
+            """
+        }
+    ],
+    "value_functions": [
+        {
+            "question": "Get previous employee's salary using LAG()",
+            "solution": """
+                SELECT name, salary,
+                       LAG(salary) OVER (ORDER BY salary) as prev_salary
+                FROM employees;
+            """
+        },
+        {
+            "question": "Get next employee's salary using LEAD()",
+            "solution": """
+                SELECT name, salary,
+                       LEAD(salary) OVER (ORDER BY salary) as next_salary
+                FROM employees;
+            """
+        },
+        {
+            "question": "Get first salary in each department using FIRST_VALUE()",
+            "solution": """
+                SELECT department, name, salary,
+                       FIRST_VALUE(salary) OVER (PARTITION BY department ORDER BY salary) as lowest_salary
+                FROM employees;
+            """
+        },
+        {
+            "question": "Get last salary in each department using LAST_VALUE()",
+            "solution": """
+                SELECT department, name, salary,
+                       LAST_VALUE(salary) OVER (
+                           PARTITION BY department 
+                           ORDER BY salary 
+                           RANGE BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+                       ) as highest_salary
+                FROM employees;
+            """
+        },
+        {
+            "question": "Get the second highest salary using NTH_VALUE()",
+            "solution": """
+                SELECT department, name, salary,
+                       NTH_VALUE(salary, 2) OVER (
+                           PARTITION BY department 
+                           ORDER BY salary DESC
+                           RANGE BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+                       ) as second_highest_salary
+                FROM employees;
+            """
+        }
+    ]
+}
+
+# Frame specifications compared by the benchmark; None keeps SQLite's default
+# frame (RANGE BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW when ordered)
+FRAME_VARIANTS = {
+    "default": None,
+    "ROWS unbounded to current": "ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW",
+    "RANGE unbounded to current": "RANGE BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW",
+    "ROWS whole partition": "ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING",
+    "RANGE whole partition": "RANGE BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING",
+    "ROWS sliding 1/1": "ROWS BETWEEN 1 PRECEDING AND 1 FOLLOWING",
+}
+
+_FRAME_CLAUSE = re.compile(r"\s+(ROWS|RANGE|GROUPS)\s+(BETWEEN|UNBOUNDED|CURRENT|\d).*$",
+                           re.IGNORECASE | re.DOTALL)
+
+def with_frame(sql, frame):
+    # Replace the frame clause of every OVER (...) in the query
+    parts = []
+    pos = 0
+    for match in re.finditer(r"\bOVER\s*\(", sql, re.IGNORECASE):
+        start = match.end()
+        depth = 1
+        end = start
+        while depth:
+            if sql[end] == "(":
+                depth += 1
+            elif sql[end] == ")":
+                depth -= 1
+            end += 1
+        spec = _FRAME_CLAUSE.sub("", sql[start:end - 1]).rstrip()
+        if frame:
+            spec = f"{spec} {frame}" if spec else frame
+        parts.append(sql[pos:start])
+        parts.append(spec)
+        pos = end - 1
+    parts.append(sql[pos:])
+    return "".join(parts)
+
+def generate_window_data(conn, partitions, partition_size, skew, seed=0):
+    # Same schema as the practice tables, with rows spread over `partitions`
+    # departments / sellers following a Zipf distribution (skew 0 = uniform)
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) ** skew for i in range(partitions)]
+    total = partitions * partition_size
+
+    conn.execute("DROP TABLE IF EXISTS sales")
+    conn.execute("DROP TABLE IF EXISTS employees")
+    conn.execute("""
+        CREATE TABLE employees (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            department TEXT,
+            salary DECIMAL(10,2),
+            hire_date DATE
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE sales (
+            id INTEGER PRIMARY KEY,
+            employee_id INTEGER,
+            amount DECIMAL(10,2),
+            sale_date DATE
+        )
+    """)
+
+    departments = rng.choices(range(1, partitions + 1), weights=weights, k=total)
+    conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?, ?)",
+        ((i + 1, f"Employee {i + 1}", f"Dept {dept}",
+          rng.randrange(30000, 150000, 500),
+          f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+         for i, dept in enumerate(departments)))
+
+    sellers = rng.choices(range(1, partitions + 1), weights=weights, k=total)
+    conn.executemany("INSERT INTO sales VALUES (?, ?, ?, ?)",
+        ((i + 1, seller, rng.randrange(100, 5000, 50),
+          f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+         for i, seller in enumerate(sellers)))
+    conn.commit()
+
+def run_window_benchmark(questions, sizes, partitions, skew, seed=0):
+    # questions: list of (label, question dict); returns one row per
+    # (partition size, question, frame variant)
+    results = []
+    for size in sizes:
+        conn = sqlite3.connect(':memory:')
+        generate_window_data(conn, partitions, size, skew, seed)
+        for label, question in questions:
+            for variant, frame in FRAME_VARIANTS.items():
+                try:
+                    stats = run_timed(conn, with_frame(question["solution"], frame))
+                except sqlite3.Error as e:
+                    stats = {"seconds": None, "memory_bytes": None, "rows": None, "error": str(e)}
+                results.append({
+                    "partition_size": size,
+                    "question": label,
+                    "frame": variant,
+                    "seconds": stats["seconds"],
+                    "memory_mb": None if stats["memory_bytes"] is None else stats["memory_bytes"] / 2**20,
+                    "rows": stats["rows"],
+                    "error": stats.get("error"),
+                })
+        conn.close()
+    return pd.DataFrame(results)
+
+def window_benchmark(category, selection):
+    st.subheader("Frame Benchmark")
+    st.write("Runs window-function questions against generated partitions and "
+             "compares every frame specification.")
+
+    scope = st.radio("Questions to benchmark:", ["Selected question", "All questions"],
+                     horizontal=True)
+    sizes = st.multiselect("Rows per partition:", [100, 1000, 5000, 20000, 50000],
+                           default=[100, 1000, 5000])
+    partitions = st.slider("Number of partitions:", 1, 50, 5)
+    skew = st.slider("Partition skew (Zipf exponent, 0 = uniform):", 0.0, 2.0, 0.0, 0.1)
+
+    if st.button("Run benchmark"):
+        if scope == "Selected question":
+            questions = [(selection["label"], selection["question"])]
+        else:
+            questions = [(f"{function_type.replace('_', ' ').title()} {i}", question)
+                         for function_type, bank in WINDOW_QUESTIONS.items()
+                         for i, question in enumerate(bank, start=1)]
+        with st.spinner("Running benchmark..."):
+            st.session_state["window_benchmark"] = run_window_benchmark(
+                questions, sorted(sizes), partitions, skew)
+
+    results = st.session_state.get("window_benchmark")
+    if results is None or results.empty:
+        return
+
+    errors = results[results["error"].notna()]
+    if not errors.empty:
+        st.warning(f"{len(errors)} variant(s) failed to run.")
+        st.dataframe(errors[["question", "frame", "error"]].drop_duplicates())
+
+    totals = results.groupby(["partition_size", "frame"])[["seconds", "memory_mb"]].sum().reset_index()
+    st.write("**Execution time (s) vs partition size**")
+    st.line_chart(totals.pivot(index="partition_size", columns="frame", values="seconds"))
+    st.write("**Peak memory growth (MB) vs partition size**")
+    st.caption("Measured for the whole server process, so queries other sessions run at the "
+               "same time are included.")
+    st.line_chart(totals.pivot(index="partition_size", columns="frame", values="memory_mb"))
+
+    st.write("**All runs**")
+    st.dataframe(results.drop(columns="error"))
+
+def window_fixture(cursor):
     # Drop existing tables
     cursor.execute("DROP TABLE IF EXISTS sales")
     cursor.execute("DROP TABLE IF EXISTS employees")
@@ -43,210 +329,23 @@ def window_questions(conn, cursor):
          (3, 2, 800, '2024-01-01'),
          (4, 2, 1200, '2024-01-02'),
          (5, 3, 2000, '2024-01-01')])
-    
-    conn.commit()
 
-    # Display tables at the top
-    st.subheader("Available Tables:")
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.write("**Employees Table**")
-        cursor.execute("SELECT * FROM employees")
-        data = cursor.fetchall()
-        df = pd.DataFrame(data, columns=['id', 'name', 'department', 'salary', 'hire_date'])
-        st.dataframe(df)
-    
-    with col2:
-        st.write("**Sales Table**")
-        cursor.execute("SELECT * FROM sales")
-        data = cursor.fetchall()
-        df = pd.DataFrame(data, columns=['id', 'employee_id', 'amount', 'sale_date'])
-        st.dataframe(df)
-    
-    st.divider()
-
-    questions = {
-        "aggregate_functions": [
-            {
-                "question": "Calculate department-wise average salary using AVG()",
-                "solution": """
-                    SELECT department, name, salary,
-                           AVG(salary) OVER (PARTITION BY department) as avg_dept_salary
-                    FROM employees;
-                """
-            },
-            {
-                "question": "Find maximum salary in each department using MAX()",
-                "solution": """
-                    SELECT department, name, salary,
-                           MAX(salary) OVER (PARTITION BY department) as max_dept_salary
-                    FROM employees;
-                """
-            },
-            {
-                "question": "Calculate minimum salary in each department using MIN()",
-                "solution": """
-                    SELECT department, name, salary,
-                           MIN(salary) OVER (PARTITION BY department) as min_dept_salary
-                    FROM employees;
-                """
-            },
-            {
-                "question": "Calculate running total of sales using SUM()",
-                "solution": """
-                    SELECT employee_id, sale_date, amount,
-                           SUM(amount) OVER (PARTITION BY employee_id ORDER BY sale_date) as running_total
-                    FROM sales;
-                """
-            },
-            {
-                "question": "Count employees in each department using COUNT()",
-                "solution": """
-                    SELECT department, name,
-                           COUNT(*) OVER (PARTITION BY department) as dept_emp_count
-                    FROM employees;
-                """
-            }
-        ],
-        "ranking_functions": [
-            {
-                "question": "Assign row numbers to employees by salary using ROW_NUMBER()",
-                "solution": """
-                    SELECT name, salary,
-                           ROW_NUMBER() OVER (ORDER BY salary DESC) as salary_rank
-                    FROM employees;
-                """
-            },
-            {
-                "question": "Rank employees by salary using RANK()",
-                "solution": """
-                    SELECT name, salary,
-                           RANK() OVER (ORDER BY salary DESC) as salary_rank
-                    FROM employees;
-                """
-            },
-            {
-                "question": "Rank employees without gaps using DENSE_RANK()",
-                "solution": """
-                    SELECT name, salary,
-                           DENSE_RANK() OVER (ORDER BY salary DESC) as dense_salary_rank
-                    FROM employees;
-                """
-            },
-            {
-                "question": "Calculate percentage rank using PERCENT_RANK()",
-                "solution": """
-                    SELECT name, salary,
-                           PERCENT_RANK() OVER (ORDER BY salary) as salary_percentile
-                    FROM employees;
-                """
-            },
-            {
-                "question": "Divide employees into quartiles using NTILE()",
-                "solution": """
-                    SELECT name, salary,
-                           NTILE(4) OVER (ORDER BY salary) as salary_quartile
-                    FROM employees;
-                """
-            }
-        ],
-        "value_functions": [
-            {
-                "question": "Get previous employee's salary using LAG()",
-                "solution": """
-                    SELECT name, salary,
-                           LAG(salary) OVER (ORDER BY salary) as prev_salary
-                    FROM employees;
-                """
-            },
-            {
-                "question": "Get next employee's salary using LEAD()",
-                "solution": """
-                    SELECT name, salary,
-                           LEAD(salary) OVER (ORDER BY salary) as next_salary
-                    FROM employees;
-                """
-            },
-            {
-                "question": "Get first salary in each department using FIRST_VALUE()",
-                "solution": """
-                    SELECT department, name, salary,
-                           FIRST_VALUE(salary) OVER (PARTITION BY department ORDER BY salary) as lowest_salary
-                    FROM employees;
-                """
-            },
-            {
-                "question": "Get last salary in each department using LAST_VALUE()",
-                "solution": """
-                    SELECT department, name, salary,
-                           LAST_VALUE(salary) OVER (
-                               PARTITION BY department 
-                               ORDER BY salary 
-                               RANGE BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
-                           ) as highest_salary
-                    FROM employees;
-                """
-            },
-            {
-                "question": "Get the second highest salary using NTH_VALUE()",
-                "solution": """
-                    SELECT department, name, salary,
-                           NTH_VALUE(salary, 2) OVER (
-                               PARTITION BY department 
-                               ORDER BY salary DESC
-                               RANGE BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
-                           ) as second_highest_salary
-                    FROM employees;
-                """
-            }
-        ]
-    }
-
-    function_type = st.selectbox("Select Window Function Type:", 
-                               list(questions.keys()), 
-                               format_func=lambda x: x.replace('_', ' ').title())
-    
-    question_index = st.selectbox("Select Question:", 
-                                range(1, len(questions[function_type]) + 1), 
-                                format_func=lambda x: f"Question {x}")
-    
-    selected_question = questions[function_type][question_index - 1]
-
-    st.subheader("Question:")
-    st.write(selected_question["question"])
-    
-    user_query = st.text_area("Enter your SQL query:")
-    
-    if st.button("Submit"):
-        try:
-            cursor.execute(user_query)
-            result = cursor.fetchall()
-            if result:
-                st.success("Query executed successfully!")
-                st.write("Result:")
-                df = pd.DataFrame(result)
-                st.dataframe(df)
-            else:
-                st.warning("Query executed but returned no results.")
-        except Exception as e:
-            st.error(f"Error executing query: {str(e)}")
-    
-    if st.button("Show Solution", key="show_solution"):
-        st.code(selected_question["solution"], language="sql")
+WINDOW_CATEGORY = Category("WINDOW FUNCTION", "SQL Window Functions Practice", window_fixture,
+                           WINDOW_QUESTIONS, previews=["employees", "sales"],
+                           type_label="Select Window Function Type:",
+                           tools={"Benchmark mode": window_benchmark},
+                           engines=["SQLite", "DuckDB"])
 
 def main():
     st.title("SQL Window Functions Practice App")
-    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn = session_sandbox()
     cursor = conn.cursor()
 
     try:
-        window_questions(conn, cursor)
+        WINDOW_CATEGORY.render(conn, cursor)
     except sqlite3.Error as e:
         st.error(f"An error occurred: {e}")
         print(f"SQLite error: {e}")
 
-    conn.close()
-
 if __name__ == "__main__":
     main()